@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Benchmark the docs build pipeline against synthetic vendored repositories.
+
+Generates local git repositories shaped like the ones conf.py vendors (a
+``docs/`` tree of N rst pages, each with M ``:doc:`` roles, and optionally a
+Python package for AutoAPI), then runs the pipeline offline against them:
+
+- ``copy_docs`` on its own
+- a cold ``sphinx-build`` (no environment or output)
+- an incremental ``sphinx-build`` with nothing changed
+- an incremental ``sphinx-build`` after one vendored page changed
+
+Each step runs in a child process and records wall time and peak RSS. The
+Sphinx builds also record the time spent in the handlers of our extensions in
+``tools/`` (handlers running in parallel write workers are not captured).
+
+Usage:
+    python benchmarks/bench_docs_build.py [--repos R] [--pages N] [--roles M]
+                                          [--modules K] [--jobs J] [--json FILE]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent / 'tools'
+BENCH_DIR = Path(__file__).resolve().parent
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.com",
+    "GIT_COMMITTER_NAME": "bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.com",
+}
+
+
+def git(*args, cwd: Path) -> None:
+    subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True,
+                   env={**os.environ, **GIT_ENV})
+
+
+def write_docs(docs: Path, name: str, pages: int, roles: int) -> None:
+    """Write ``pages`` rst pages, each with ``roles`` :doc: references."""
+    docs.mkdir(parents=True, exist_ok=True)
+    names = [f"page{i:05d}" for i in range(pages)]
+    toctree = "\n".join(f"   {page}" for page in names)
+    (docs / 'index.rst').write_text(
+        f"{name}\n{'=' * len(name)}\n\n.. toctree::\n   :maxdepth: 1\n\n{toctree}\n",
+        encoding='utf-8',
+    )
+    for i, page in enumerate(names):
+        refs = "\n".join(f"See :doc:`{names[(i + j + 1) % pages]}` for more."
+                         for j in range(roles))
+        title = f"{name} {page}"
+        (docs / f"{page}.rst").write_text(
+            f"{title}\n{'=' * len(title)}\n\n"
+            f"Intro paragraph for {page}.\n\n{refs}\n\n"
+            "Details\n-------\n\n"
+            ".. code-block:: python\n\n    value = 1\n",
+            encoding='utf-8',
+        )
+
+
+def write_package(root: Path, package: str, modules: int) -> None:
+    """Write a Python package with ``modules`` modules for AutoAPI."""
+    pkg = root / package
+    pkg.mkdir(parents=True)
+    (pkg / '__init__.py').write_text(f'"""The {package} package."""\n', encoding='utf-8')
+    for i in range(modules):
+        (pkg / f"module{i:03d}.py").write_text(
+            f'"""Module {i}."""\n\n\n'
+            f"class Widget{i}:\n"
+            f'    """A widget.\n\n    Parameters\n    ----------\n    size : int\n        Its size.\n    """\n\n'
+            "    def __init__(self, size: int):\n        self.size = size\n\n"
+            "    def grow(self, by: int = 1) -> int:\n"
+            '        """Grow the widget."""\n        return self.size + by\n\n'
+            # One long unbroken docstring line, which must still be split
+            # into bounded api chunks
+            "    def describe(self) -> str:\n"
+            f'        """{"Describes the widget in detail. " * 100}"""\n'
+            "        return str(self.size)\n\n\n"
+            f"def make_widget{i}(size: int) -> Widget{i}:\n"
+            f'    """Make a widget."""\n    return Widget{i}(size)\n',
+            encoding='utf-8',
+        )
+
+
+def make_repo(origins: Path, name: str, pages: int, roles: int, modules: int) -> Path:
+    """Create a synthetic origin repository with a ``main`` branch."""
+    repo = origins / name
+    write_docs(repo / 'docs', name, pages, roles)
+    if modules:
+        write_package(repo, name.replace('-', '_'), modules)
+    git('init', '-q', '-b', 'main', cwd=repo)
+    git('add', '-A', cwd=repo)
+    git('commit', '-q', '-m', 'initial', cwd=repo)
+    return repo
+
+
+def make_workspace(root: Path, args) -> list:
+    """Create origin repos, pre-cloned vendor checkouts and a docs source dir."""
+    origins = root / 'origins'
+    vendor = root / 'vendor'
+    srcdir = root / 'docs/source'
+    origins.mkdir()
+    vendor.mkdir()
+    srcdir.mkdir(parents=True)
+
+    repos = []
+    for i in range(args.repos):
+        name = f"project{i}"
+        # The first repo also carries the package documented by AutoAPI
+        modules = args.modules if i == 0 else 0
+        origin = make_repo(origins, name, args.pages, args.roles, modules)
+        # copy_docs clones with gh; a local clone lets it fetch offline instead
+        git('clone', '-q', str(origin), str(vendor / name), cwd=root)
+        git('checkout', '-q', '--detach', cwd=vendor / name)
+        repos.append((f"bench/{name}", 'origin/main'))
+
+    names = [repo.split('/')[1] for repo, _ in repos]
+    toctree = "\n".join(f"   {name}/index" for name in names)
+    (srcdir / 'index.rst').write_text(
+        f"Benchmark\n=========\n\n.. toctree::\n   :maxdepth: 1\n\n{toctree}\n",
+        encoding='utf-8',
+    )
+
+    extensions = ['sphinx_json_index', 'sphinx_llms_enhancements', 'sphinx_chunks',
+                  'sphinx_precompress', 'bench_timing']
+    autoapi = ""
+    if args.modules and _has_module('autoapi'):
+        extensions[:0] = ['autoapi.extension', 'sphinx_autoapi_cache']
+        autoapi = (
+            f"autoapi_dirs = [Path('../../vendor/{names[0]}/{names[0]}')]\n"
+            f"autoapi_root = '{names[0]}/autoapi'\n"
+            "autoapi_keep_files = True\n"
+            "autoapi_add_toctree_entry = False\n"
+        )
+    roles = "\n".join(f".. role:: {name}" for name in names)
+
+    (srcdir / 'conf.py').write_text(
+        "import sys\n"
+        "from pathlib import Path\n"
+        f"sys.path.append({str(TOOLS_DIR)!r})\n"
+        f"sys.path.append({str(BENCH_DIR)!r})\n"
+        "from copy_docs import copy_docs\n"
+        f"repo_list = copy_docs({repos!r}, keep={{{names[0]!r}: ['autoapi/**']}})\n"
+        "project = 'Benchmark'\n"
+        "version = '0.0'\n"
+        f"extensions = {extensions!r}\n"
+        f"rst_prolog = {roles!r}\n"
+        f"{autoapi}",
+        encoding='utf-8',
+    )
+    return repos
+
+
+def _has_module(name: str) -> bool:
+    import importlib.util
+    return importlib.util.find_spec(name) is not None
+
+
+def check_chunks(root: Path, max_chars: int = 1500) -> None:
+    """Fail if any exported api chunk exceeds ``max_chars`` (chunks_max_chars)."""
+    for shard in (root / 'docs/build/chunks').glob('chunks-*.jsonl'):
+        for line in shard.read_text(encoding='utf-8').splitlines():
+            chunk = json.loads(line)
+            if chunk["type"] == "api" and len(chunk["text"]) > max_chars:
+                raise SystemExit(f"api chunk {chunk['id']} has {len(chunk['text'])} chars")
+
+
+def run_step(label: str, cmd: list, root: Path, verbose: bool) -> dict:
+    """Run a child process and return its wall time and peak RSS."""
+    timings_path = root / 'timings.json'
+    if timings_path.exists():
+        timings_path.unlink()
+
+    env = {**os.environ, "PDM_PROJECT_ROOT": str(root),
+           "BENCH_TIMINGS": str(timings_path)}
+    output = None if verbose else subprocess.DEVNULL
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=root, env=env, stdout=output, stderr=output)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise SystemExit(f"{label} failed with exit code {proc.returncode}")
+
+    result = {
+        "step": label,
+        "seconds": elapsed,
+        # ru_maxrss is in kilobytes on Linux
+        "max_rss_mb": rusage.ru_maxrss / 1024,
+    }
+    if timings_path.exists():
+        result["handlers"] = json.loads(timings_path.read_text(encoding='utf-8'))
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repos', type=int, default=3, help="number of vendored repos")
+    parser.add_argument('--pages', type=int, default=200, help="rst pages per repo")
+    parser.add_argument('--roles', type=int, default=5, help=":doc: roles per page")
+    parser.add_argument('--modules', type=int, default=20,
+                        help="modules in the AutoAPI package (0 to disable)")
+    parser.add_argument('--jobs', default='1', help="sphinx-build -j value")
+    parser.add_argument('--json', type=Path, help="also write results to this file")
+    parser.add_argument('--keep', type=Path, help="build in this directory and keep it")
+    parser.add_argument('--verbose', action='store_true', help="show child process output")
+    args = parser.parse_args()
+
+    if args.keep:
+        if args.keep.exists():
+            shutil.rmtree(args.keep)
+        args.keep.mkdir(parents=True)
+        root = args.keep.resolve()
+        cleanup = None
+    else:
+        cleanup = tempfile.TemporaryDirectory()
+        root = Path(cleanup.name)
+
+    try:
+        print(f"Generating {args.repos} repos x {args.pages} pages x {args.roles} roles "
+              f"({args.modules} AutoAPI modules) in {root}")
+        repos = make_workspace(root, args)
+
+        copy_cmd = [sys.executable, '-c',
+                    f"import sys; sys.path.append({str(TOOLS_DIR)!r}); "
+                    f"from copy_docs import copy_docs; copy_docs({repos!r})"]
+        sphinx_cmd = [sys.executable, '-m', 'sphinx', '-q', '-j', args.jobs,
+                      'docs/source', 'docs/build']
+
+        results = [run_step("copy_docs", copy_cmd, root, args.verbose)]
+        results.append(run_step("sphinx-build (cold)", sphinx_cmd, root, args.verbose))
+        check_chunks(root)
+        results.append(run_step("sphinx-build (no change)", sphinx_cmd, root, args.verbose))
+
+        # Change one vendored page upstream and rebuild
+        name = repos[0][0].split('/')[1]
+        page = root / 'origins' / name / 'docs/page00000.rst'
+        page.write_text(page.read_text(encoding='utf-8') + "\nOne more line.\n", encoding='utf-8')
+        git('commit', '-q', '-am', 'change one page', cwd=page.parent.parent)
+        results.append(run_step("sphinx-build (one page changed)", sphinx_cmd, root, args.verbose))
+    finally:
+        if cleanup is not None:
+            cleanup.cleanup()
+
+    print(f"\n{'step':52} {'time (s)':>10} {'peak RSS (MB)':>14}")
+    for result in results:
+        print(f"{result['step']:52} {result['seconds']:10.2f} {result['max_rss_mb']:14.1f}")
+        for handler, seconds in sorted(result.get("handlers", {}).items()):
+            print(f"  {handler:50} {seconds:10.3f}")
+
+    if args.json:
+        settings = {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()}
+        args.json.write_text(json.dumps({"args": settings, "results": results}, indent=2),
+                             encoding='utf-8')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark docs-index.json title collection.
+
+Compares the original approach (unpickling every doctree with
+``env.get_doctree`` and walking it for the first title) against reading the
+titles the environment already holds in ``env.titles``.
+
+Usage:
+    python benchmarks/bench_json_index.py [--pages N] [--sections M]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sphinx.application import Sphinx
+from sphinx.util.docutils import docutils_namespace
+
+
+def make_project(srcdir: Path, pages: int, sections: int) -> None:
+    """Write a synthetic Sphinx project with ``pages`` pages of ``sections`` sections."""
+    (srcdir / 'conf.py').write_text("project = 'bench'\n", encoding='utf-8')
+
+    names = [f"page{i:05d}" for i in range(pages)]
+    toctree = "\n".join(f"   {name}" for name in names)
+    (srcdir / 'index.rst').write_text(
+        f"Benchmark\n=========\n\n.. toctree::\n   :maxdepth: 1\n\n{toctree}\n",
+        encoding='utf-8',
+    )
+
+    body = []
+    for s in range(sections):
+        heading = f"Section {s}"
+        body.append(f"{heading}\n{'-' * len(heading)}\n\n"
+                    "Some prose with ``inline code`` and a *bit* of **markup**.\n\n"
+                    ".. code-block:: python\n\n    x = 1\n    y = x + 1\n")
+    body = "\n".join(body)
+
+    for name in names:
+        title = f"Page {name}"
+        (srcdir / f"{name}.rst").write_text(
+            f"{title}\n{'=' * len(title)}\n\n{body}", encoding='utf-8'
+        )
+
+
+def titles_from_doctrees(app: Sphinx) -> dict:
+    """Original approach: unpickle and traverse every doctree."""
+    titles = {}
+    for docname in sorted(app.env.found_docs):
+        doc = app.env.get_doctree(docname)
+        title = ""
+        for node in doc.traverse():
+            if node.__class__.__name__ == 'title':
+                title = node.astext()
+                break
+        titles[docname] = title
+    return titles
+
+
+def titles_from_env(app: Sphinx) -> dict:
+    """Current approach: use the titles collected during the read phase."""
+    titles = {}
+    for docname in sorted(app.env.found_docs):
+        title_node = app.env.titles.get(docname)
+        titles[docname] = title_node.astext() if title_node is not None else ""
+    return titles
+
+
+def timed(fn, app: Sphinx, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(app)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=500)
+    parser.add_argument('--sections', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        srcdir = tmp / 'src'
+        srcdir.mkdir()
+        make_project(srcdir, args.pages, args.sections)
+
+        print(f"Building synthetic project ({args.pages} pages)...")
+        with docutils_namespace():
+            app = Sphinx(srcdir, srcdir, tmp / 'out', tmp / 'doctrees', 'html',
+                         status=None, warning=sys.stderr, freshenv=True)
+            app.build()
+
+            assert titles_from_doctrees(app) == titles_from_env(app)
+
+            old = timed(titles_from_doctrees, app, args.repeat)
+            new = timed(titles_from_env, app, args.repeat)
+
+    print(f"get_doctree + traverse: {old * 1000:9.2f} ms")
+    print(f"env.titles:             {new * 1000:9.2f} ms")
+    print(f"speedup:                {old / new:9.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark llms.txt section reorganization.
+
+Compares the original approach (``re.search`` of every uncompiled pattern for
+every page, building the output with ``+=``) against the precompiled
+``SectionClassifier`` used by ``reorganize_llms_txt``, on a synthetic llms.txt.
+
+Usage:
+    python benchmarks/bench_llms_sections.py [--pages N]
+"""
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tools'))
+
+from sphinx_llms_enhancements import (  # noqa: E402
+    DEFAULT_SECTION_MAPPINGS, compile_llms_sections, reorganize_llms_txt,
+)
+
+PREFIXES = [
+    "chipflow-lib/autoapi/chipflow/{}/index.html.md",
+    "chipflow-lib/{}.html.md",
+    "chipflow-digital-ip/{}.html.md",
+    "amaranth/{}.html.md",
+    "amaranth/changes/{}.html.md",
+    "amaranth-soc/{}.html.md",
+    "examples/{}.html.md",
+    "misc/{}.html.md",
+]
+
+
+def make_llms_txt(pages: int) -> str:
+    rng = random.Random(0)
+    lines = ["# Benchmark", "", "> Synthetic llms.txt", "", "## Pages", ""]
+    for i in range(pages):
+        path = rng.choice(PREFIXES).format(f"page{i}")
+        if i % 2:
+            lines.append(f"- [Page {i}]({path}): Description of page {i}")
+        else:
+            lines.append(f"- [Page {i}]({path})")
+    return "\n".join(lines) + "\n"
+
+
+def legacy_reorganize(content: str, section_mappings: dict) -> str:
+    """Original implementation of reorganize_llms_txt, minus file handling."""
+    header = re.match(r'^(.*?)(?=^## Pages|\Z)', content, re.MULTILINE | re.DOTALL).group(1).strip()
+    page_pattern = re.compile(r'^- \[([^\]]+)\]\(([^)]+)\)(?::\s*(.*))?$', re.MULTILINE)
+    pages = [(m.group(1), m.group(2), m.group(3) or '') for m in page_pattern.finditer(content)]
+
+    sections = {name: [] for name in section_mappings.keys()}
+    sections["Other"] = []
+
+    for title, path, description in pages:
+        categorized = False
+        for section_name, patterns in section_mappings.items():
+            for pattern in patterns:
+                if re.search(pattern, path):
+                    sections[section_name].append((title, path, description))
+                    categorized = True
+                    break
+            if categorized:
+                break
+        if not categorized:
+            sections["Other"].append((title, path, description))
+
+    new_content = header + "\n\n"
+    for section_name, section_pages in sections.items():
+        if not section_pages:
+            continue
+        new_content += f"## {section_name}\n\n"
+        for title, path, description in section_pages:
+            if description:
+                new_content += f"- [{title}]({path}): {description}\n"
+            else:
+                new_content += f"- [{title}]({path})\n"
+        new_content += "\n"
+    return new_content.strip() + "\n"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    content = make_llms_txt(args.pages)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        llms_txt_path = Path(tmp) / 'llms.txt'
+        config = SimpleNamespace(llms_sections=DEFAULT_SECTION_MAPPINGS)
+        app = SimpleNamespace(outdir=tmp, config=config)
+        compile_llms_sections(app, config)
+
+        old = new = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            expected = legacy_reorganize(content, DEFAULT_SECTION_MAPPINGS)
+            old = min(old, time.perf_counter() - start)
+
+            llms_txt_path.write_text(content, encoding='utf-8')
+            start = time.perf_counter()
+            reorganize_llms_txt(app, None)
+            new = min(new, time.perf_counter() - start)
+
+        assert llms_txt_path.read_text(encoding='utf-8') == expected
+
+    print(f"pages: {args.pages}")
+    print(f"re.search per pattern + '+=': {old * 1000:9.2f} ms")
+    print(f"SectionClassifier + stream:  {new * 1000:9.2f} ms")
+    print(f"speedup:                     {old / new:9.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
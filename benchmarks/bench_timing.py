@@ -0,0 +1,59 @@
+"""
+Sphinx extension used by bench_docs_build.py to time our extensions' handlers.
+
+Wraps every event listener defined in ``tools/`` with a timer and writes the
+accumulated seconds per handler to the file named by ``$BENCH_TIMINGS`` when
+the build finishes. Only handlers running in the main process are counted.
+"""
+import json
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+from sphinx.application import Sphinx
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent / 'tools'
+
+_timings = defaultdict(float)
+
+
+def _wrap(handler):
+    name = f"{handler.__module__}.{handler.__name__}"
+
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            _timings[name] += time.perf_counter() - start
+
+    return timed
+
+
+def _is_ours(handler) -> bool:
+    code = getattr(handler, '__code__', None)
+    return code is not None and Path(code.co_filename).resolve().parent == TOOLS_DIR
+
+
+def wrap_listeners(app: Sphinx, config) -> None:
+    for event, listeners in app.events.listeners.items():
+        for i, listener in enumerate(listeners):
+            if _is_ours(listener.handler):
+                listeners[i] = listener._replace(handler=_wrap(listener.handler))
+
+
+def write_timings(app: Sphinx, exception) -> None:
+    path = os.environ.get('BENCH_TIMINGS')
+    if path:
+        Path(path).write_text(json.dumps(dict(_timings), indent=2), encoding='utf-8')
+
+
+def setup(app: Sphinx):
+    # Listed last in extensions, so every tools/ listener is registered already
+    app.connect('config-inited', wrap_listeners, priority=0)
+    app.connect('build-finished', write_timings, priority=1000)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -5,12 +5,21 @@ A FastAPI backend that provides AI-powered Q&A for ChipFlow documentation.
 Uses Vertex AI for embeddings and LLM responses with simple in-memory RAG.
 """
 import os
+import gzip
+import asyncio
 import json
+import hashlib
 import logging
 import smtplib
+import time
+import uuid
+from abc import ABC, abstractmethod
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional
 from contextlib import asynccontextmanager
 
 import numpy as np
@@ -25,14 +34,36 @@ logger = logging.getLogger(__name__)
 
 # Configuration
 DOCS_URL = os.getenv("DOCS_URL", "https://chipflow-docs.docs.chipflow-infra.com/llms-full.txt")
+CHUNKS_URL = os.getenv("CHUNKS_URL", "")  # defaults to chunks/manifest.json next to DOCS_URL
+DOCS_INDEX_URL = os.getenv("DOCS_INDEX_URL", "")  # defaults to docs-index.json next to DOCS_URL
+CACHE_DIR = Path(os.getenv("CACHE_DIR", "/tmp/chipflow-docs-cache"))  # conditional GET cache
 GCP_PROJECT = os.getenv("GCP_PROJECT", "chipflow-docs")
 GCP_LOCATION = os.getenv("GCP_LOCATION", "us-central1")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 SMTP_USER = os.getenv("SMTP_USER", "")  # Gmail address
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")  # Gmail App Password
 SUPPORT_EMAIL = os.getenv("SUPPORT_EMAIL", "support@chipflow.io")
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "vertex")  # "vertex" or "onnx"
 EMBEDDING_MODEL = "text-embedding-005"
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "")  # dir with model.onnx + tokenizer.json
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0")) or os.cpu_count()
 LLM_MODEL = "gemini-2.0-flash"
+RELEVANCE_THRESHOLD = 0.5  # Minimum similarity for a chunk to be used as context
+PAGE_BOOST = 0.05  # Ranking boost for chunks from the page the user is on
+NEIGHBOUR_BOOST = 0.02  # Ranking boost for chunks from its toctree neighbours
+
+# Server-side conversation sessions
+SESSION_MAX = int(os.getenv("SESSION_MAX", "1000"))  # Sessions kept in memory (LRU)
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))  # Seconds of inactivity before expiry
+SESSION_RECENT_MESSAGES = 4  # Messages kept verbatim in the prompt
+SESSION_SUMMARY_CHARS = 1500  # Bound on the running summary of older turns
+SESSION_TRANSCRIPT_MESSAGES = 20  # Messages kept verbatim for support requests
+
+# Per-project index shards, routed by similarity to each shard's centroid
+PROJECT_SHARDS = ["amaranth", "amaranth-soc", "chipflow-lib", "chipflow-digital-ip"]
+SHARD_ROUTING = os.getenv("SHARD_ROUTING", "centroid")  # "centroid" or "all"
+ROUTE_MAX_SHARDS = int(os.getenv("ROUTE_MAX_SHARDS", "2"))
+ROUTE_MARGIN = 0.05  # Also search shards whose centroid is this close to the best
 
 # Allowed origins for CORS
 ALLOWED_ORIGINS = [
@@ -45,19 +76,22 @@ ALLOWED_ORIGINS = [
 
 class ChatRequest(BaseModel):
     question: str
-    conversation_history: list = []
+    session_id: Optional[str] = None
+    conversation_history: list = []  # Only used to seed a new session
     page: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
     answer: str
     sources: list = []
+    session_id: Optional[str] = None
 
 
 class SupportRequest(BaseModel):
     email: str
     subject: str
     message: str
+    session_id: Optional[str] = None
     conversation_history: list = []
     page: Optional[str] = None
 
@@ -67,31 +101,521 @@ class SupportResponse(BaseModel):
     message: str
 
 
+class SessionTurnRequest(BaseModel):
+    session_id: str
+    question: str
+    answer: str
+
+
+class SessionTurnResponse(BaseModel):
+    session_id: str
+
+
+class Session(BaseModel):
+    """
+    A conversation: a running summary of older turns plus the recent messages
+    for the prompt, and a longer verbatim transcript for support requests.
+    """
+    id: str
+    summary: list[str] = []
+    recent: list[dict] = []
+    transcript: list[dict] = []
+    updated: float = 0.0
+
+    def add_turn(self, question: str, answer: str):
+        turn = [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+        self.recent.extend(turn)
+        self.transcript = (self.transcript + turn)[-SESSION_TRANSCRIPT_MESSAGES:]
+
+        # Fold turns that fall out of the recent window into the summary, so
+        # the prompt stays the same size however long the conversation gets
+        while len(self.recent) > SESSION_RECENT_MESSAGES:
+            user, assistant = self.recent[0], self.recent[1]
+            self.recent = self.recent[2:]
+            self.summary.append(
+                f"User asked: {_clip(user['content'], 200)} / "
+                f"Assistant: {_clip(assistant['content'], 200)}"
+            )
+        while self.summary and sum(len(line) + 1 for line in self.summary) > SESSION_SUMMARY_CHARS:
+            self.summary.pop(0)
+
+    def history_text(self) -> str:
+        text = ""
+        if self.summary:
+            text += "Summary of earlier conversation:\n"
+            text += "".join(f"- {line}\n" for line in self.summary)
+        for msg in self.recent:
+            role = "User" if msg.get("role") == "user" else "Assistant"
+            text += f"{role}: {msg.get('content', '')}\n"
+        return text
+
+
+def format_transcript(messages: list[dict]) -> str:
+    """Format messages verbatim, one paragraph per message."""
+    text = ""
+    for msg in messages:
+        role = "User" if msg.get("role") == "user" else "Assistant"
+        text += f"\n{role}: {msg.get('content', '')}\n"
+    return text
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+class SessionBackend(ABC):
+    """Storage for conversation sessions. Subclass to use an external store."""
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[Session]:
+        """Return the session, or None if it is unknown or has expired."""
+
+    @abstractmethod
+    async def save(self, session: Session):
+        """Store the session and mark it as recently used."""
+
+
+class InMemorySessionBackend(SessionBackend):
+    """Bounded in-process session store: least recently used first out, with a TTL."""
+
+    def __init__(self, max_sessions: int = SESSION_MAX, ttl: float = SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sessions: OrderedDict[str, Session] = OrderedDict()
+
+    async def get(self, session_id: str) -> Optional[Session]:
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None
+        if time.monotonic() - session.updated > self.ttl:
+            del self.sessions[session_id]
+            return None
+        self.sessions.move_to_end(session_id)
+        return session
+
+    async def save(self, session: Session):
+        session.updated = time.monotonic()
+        self.sessions[session.id] = session
+        self.sessions.move_to_end(session.id)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+
+
+async def get_or_create_session(session_id: Optional[str], history: list) -> Session:
+    """
+    Return the caller's session, or a new one seeded from ``history``.
+
+    An unknown or expired ``session_id`` without ``history`` is rejected with
+    409, so the client can retry with its copy of the conversation.
+    """
+    if session_id:
+        session = await session_store.get(session_id)
+        if session is not None:
+            return session
+        if not history:
+            raise HTTPException(status_code=409, detail="Unknown or expired session")
+
+    session = Session(id=uuid.uuid4().hex)
+    for question, answer in zip(history[::2], history[1::2]):
+        session.add_turn(question.get("content", ""), answer.get("content", ""))
+    return session
+
+
+def join_url(base: str, path: str) -> str:
+    """Resolve ``path`` relative to ``base``, which may be a URL or a local file."""
+    if "://" not in base:
+        return str(Path(base).parent / path)
+    return str(httpx.URL(base).join(path))
+
+
+class EmbeddingProvider(ABC):
+    """Turns texts into embedding vectors. ``name`` identifies the model."""
+
+    name: str = ""
+
+    @abstractmethod
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        """Return one embedding row per text."""
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        return (await self.embed([text]))[0]
+
+
+class VertexEmbeddingProvider(EmbeddingProvider):
+    """Embeddings from a Vertex AI text embedding model."""
+
+    batch_size = 5
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        self.name = f"vertex:{model_name}"
+        self.model_name = model_name
+        self._model = None
+
+    def _get_model(self):
+        if self._model is None:
+            from google.cloud import aiplatform
+            from vertexai.language_models import TextEmbeddingModel
+
+            aiplatform.init(project=GCP_PROJECT, location=GCP_LOCATION)
+            self._model = TextEmbeddingModel.from_pretrained(self.model_name)
+        return self._model
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        return [e.values for e in self._get_model().get_embeddings(texts)]
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        # Process in batches, off the event loop
+        all_embeddings = []
+        for i in range(0, len(texts), self.batch_size):
+            batch = texts[i:i + self.batch_size]
+            all_embeddings.extend(await asyncio.to_thread(self._embed_batch, batch))
+        return np.array(all_embeddings)
+
+
+class OnnxEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeddings from a local ONNX sentence-embedding model, run on the CPU.
+
+    ``model_dir`` must contain ``model.onnx`` and ``tokenizer.json`` (e.g. an
+    export of sentence-transformers/all-MiniLM-L6-v2). Batches run in
+    parallel on a thread pool; outputs are mean-pooled and normalized.
+    """
+
+    batch_size = 32
+    max_tokens = 256
+
+    def __init__(self, model_dir: str, threads: int = EMBEDDING_THREADS):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        # The name keys the embedding cache, so it must change with the model
+        # files, not just the directory they were exported to
+        digest = hashlib.sha256()
+        for filename in ("model.onnx", "tokenizer.json"):
+            with open(model_dir / filename, "rb") as f:
+                digest.update(hashlib.file_digest(f, "sha256").digest())
+        self.name = f"onnx:{model_dir.name}:{digest.hexdigest()[:12]}"
+
+        options = onnxruntime.SessionOptions()
+        # Parallelism comes from running batches on the pool
+        options.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            str(model_dir / "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_tokens)
+        self.tokenizer.enable_padding()
+
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        output = self.session.run(None, feeds)[0]
+        if output.ndim == 3:
+            # Mean-pool token embeddings over the real (unpadded) tokens
+            mask = attention_mask[..., None].astype(output.dtype)
+            output = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(output, axis=1, keepdims=True)
+        return output / np.where(norms == 0, 1, norms)
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self.pool, self._embed_batch, batch) for batch in batches)
+        )
+        return np.concatenate(results) if results else np.empty((0, 0))
+
+
+def make_embedding_provider() -> EmbeddingProvider:
+    """Create the embedding provider selected by EMBEDDING_PROVIDER."""
+    if EMBEDDING_PROVIDER == "onnx":
+        if not LOCAL_EMBEDDING_MODEL:
+            raise RuntimeError("EMBEDDING_PROVIDER=onnx requires LOCAL_EMBEDDING_MODEL")
+        return OnnxEmbeddingProvider(LOCAL_EMBEDDING_MODEL)
+    if EMBEDDING_PROVIDER == "vertex":
+        return VertexEmbeddingProvider()
+    raise RuntimeError(f"Unknown EMBEDDING_PROVIDER: {EMBEDDING_PROVIDER}")
+
+
+class IndexShard(NamedTuple):
+    """A per-project slice of the document store: rows [start, stop)."""
+    name: str
+    start: int
+    stop: int
+    centroid: np.ndarray
+
+
+def shard_name(chunk: dict) -> str:
+    """Return the index shard a chunk belongs to."""
+    docname = chunk.get("docname")
+    if docname is None:
+        return "docs"
+    if docname.startswith("chipflow-lib/autoapi/"):
+        return "autoapi"
+    project = docname.split("/", 1)[0]
+    return project if project in PROJECT_SHARDS else "chipflow-docs"
+
+
 class DocumentStore:
     """Simple in-memory document store with vector search."""
 
-    def __init__(self):
+    def __init__(self, embedder: EmbeddingProvider):
+        self.embedder = embedder
         self.chunks: list[dict] = []
         self.embeddings: Optional[np.ndarray] = None
+        self.normalized: Optional[np.ndarray] = None
+        # Page awareness: URL path -> docname, docname -> chunk rows, and
+        # docname -> rows of the page and its toctree neighbours
+        self.path_to_page: dict[str, str] = {}
+        self.page_rows: dict[str, np.ndarray] = {}
+        self.neighbour_rows: dict[str, np.ndarray] = {}
+        self.shards: dict[str, IndexShard] = {}
+        # Changes whenever answers may change: new chunks or another model
+        self.index_version = ""
         self.initialized = False
 
-    async def initialize(self, docs_url: str):
+    async def initialize(self, docs_url: str, chunks_url: str = "", docs_index_url: str = ""):
         """Load and process documentation."""
-        logger.info(f"Fetching documentation from {docs_url}")
-
         async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.get(docs_url)
+            # Prefer the chunks exported at docs build time; without an
+            # explicit URL, fall back to chunking llms-full.txt if the docs
+            # site doesn't publish them
+            manifest_url = chunks_url or join_url(docs_url, "chunks/manifest.json")
+            try:
+                self.chunks = await self._load_chunks(client, manifest_url)
+            except (httpx.HTTPStatusError, FileNotFoundError) as e:
+                not_found = (isinstance(e, FileNotFoundError)
+                             or e.response.status_code == 404)
+                if chunks_url or not not_found:
+                    raise
+                logger.info(f"No exported chunks at {manifest_url}")
+                self.chunks = []
+
+            if not self.chunks:
+                logger.info(f"Fetching documentation from {docs_url}")
+                content = await self._fetch_text(client, docs_url)
+
+                # Split into chunks (by section headers or fixed size)
+                self.chunks = self._chunk_content(content)
+            logger.info(f"Created {len(self.chunks)} chunks")
+
+            # Keep each shard's chunks contiguous, so a shard is a row range
+            self.chunks.sort(key=shard_name)
+
+            # Only exported chunks know which page they came from
+            if any("docname" in c for c in self.chunks):
+                index_url = docs_index_url or join_url(docs_url, "docs-index.json")
+                try:
+                    index = json.loads(await self._fetch_text(client, index_url))
+                    self._build_page_graph(index)
+                except (httpx.HTTPError, OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Page-aware retrieval disabled, could not load {index_url}: {e}")
+
+        digest = hashlib.sha256(f"{self.embedder.name}\0{LLM_MODEL}".encode())
+        for chunk in self.chunks:
+            digest.update(b"\0")
+            digest.update(chunk["text"].encode("utf-8"))
+        self.index_version = digest.hexdigest()[:16]
+
+        # Generate embeddings shard by shard, reusing cached ones that are unchanged
+        ranges = []
+        shard_embeddings = []
+        start = 0
+        while start < len(self.chunks):
+            name = shard_name(self.chunks[start])
+            stop = start
+            while stop < len(self.chunks) and shard_name(self.chunks[stop]) == name:
+                stop += 1
+            shard_embeddings.append(await self._load_shard_embeddings(name, self.chunks[start:stop]))
+            ranges.append((name, start, stop))
+            start = stop
+
+        self.embeddings = np.concatenate(shard_embeddings) if shard_embeddings else np.empty((0, 0))
+        norms = np.linalg.norm(self.embeddings, axis=1, keepdims=True)
+        self.normalized = self.embeddings / np.where(norms == 0, 1, norms)
+
+        # Centroids of the normalized rows, used to route queries
+        self.shards = {}
+        for name, start, stop in ranges:
+            centroid = self.normalized[start:stop].mean(axis=0)
+            self.shards[name] = IndexShard(name, start, stop, centroid / (np.linalg.norm(centroid) or 1))
+        logger.info("Index shards: " + ", ".join(
+            f"{s.name} ({s.stop - s.start})" for s in self.shards.values()))
+        self.initialized = True
+        logger.info(f"Document store initialized with {self.embedder.name} embeddings")
+
+    async def _load_chunks(self, client: httpx.AsyncClient, manifest_url: str) -> list[dict]:
+        """Load the sharded JSONL chunk corpus described by a manifest."""
+        logger.info(f"Fetching chunk manifest from {manifest_url}")
+        manifest = json.loads(await self._fetch_text(client, manifest_url))
+
+        chunks = []
+        for shard in manifest["shards"]:
+            shard_url = join_url(manifest_url, shard["path"])
+            for line in (await self._fetch_text(client, shard_url)).splitlines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                # Title shown in sources: the section path within the page
+                section = chunk.get("section") or [chunk.get("title", "Documentation")]
+                chunk["title"] = " > ".join(section)
+                chunks.append(chunk)
+
+        return chunks
+
+    async def _load_shard_embeddings(self, name: str, chunks: list[dict]) -> np.ndarray:
+        """
+        Return the embeddings of one shard's chunks.
+
+        Embeddings are cached on disk keyed by the shard's content and the
+        embedding model, so a docs update only re-embeds the shards it touched.
+        """
+        digest = hashlib.sha256(self.embedder.name.encode())
+        for chunk in chunks:
+            digest.update(b"\0")
+            digest.update(chunk["text"].encode("utf-8"))
+        shard_dir = CACHE_DIR / "shards"
+        model_slug = "".join(c if c.isalnum() else "_" for c in self.embedder.name)
+        cache_path = shard_dir / f"{name}.{model_slug}.{digest.hexdigest()[:16]}.npz"
+
+        if cache_path.exists():
+            # The cached index records the model that produced it
+            with np.load(cache_path) as cached:
+                if str(cached["model"]) == self.embedder.name:
+                    logger.info(f"Loaded cached embeddings for shard {name}")
+                    return cached["embeddings"]
+
+        logger.info(f"Embedding shard {name} ({len(chunks)} chunks) with {self.embedder.name}")
+        embeddings = await self.embedder.embed([c["text"] for c in chunks])
+        try:
+            shard_dir.mkdir(parents=True, exist_ok=True)
+            for stale in shard_dir.glob(f"{name}.{model_slug}.*.npz"):
+                stale.unlink()
+            np.savez(cache_path, embeddings=embeddings, model=np.array(self.embedder.name))
+        except OSError as e:
+            logger.warning(f"Could not cache embeddings for shard {name}: {e}")
+        return embeddings
+
+    def _route(self, query_vec: np.ndarray, docname: Optional[str]) -> list[IndexShard]:
+        """Pick the shards to search for a (normalized) query."""
+        shards = list(self.shards.values())
+        if SHARD_ROUTING == "all" or len(shards) <= 1:
+            return shards
+
+        scores = np.array([s.centroid @ query_vec for s in shards])
+        order = np.argsort(scores)[::-1]
+        selected = [shards[i] for i in order[:ROUTE_MAX_SHARDS]
+                    if scores[i] >= scores[order[0]] - ROUTE_MARGIN]
+
+        # Always search the shard of the page the user is on
+        if docname is not None and docname in self.page_rows:
+            row = self.page_rows[docname][0]
+            for shard in shards:
+                if shard.start <= row < shard.stop and shard not in selected:
+                    selected.append(shard)
+        return selected
+
+    def _score_shard(self, shard: IndexShard, query_vec: np.ndarray) -> np.ndarray:
+        return self.normalized[shard.start:shard.stop] @ query_vec
+
+    def _build_page_graph(self, index: dict):
+        """Precompute page-to-chunk rows and toctree neighbourhoods from docs-index.json."""
+        rows = defaultdict(list)
+        for i, chunk in enumerate(self.chunks):
+            if "docname" in chunk:
+                rows[chunk["docname"]].append(i)
+
+        # Parents, children and siblings in the toctree are neighbours
+        neighbours = defaultdict(set)
+        self.path_to_page = {}
+        for page in index["pages"]:
+            docname = page["docname"]
+            self.path_to_page[page["path"]] = docname
+            children = page.get("children", [])
+            for child in children:
+                neighbours[docname].add(child)
+                neighbours[child].update(children)
+                neighbours[child].add(docname)
+
+        self.page_rows = {doc: np.array(r) for doc, r in rows.items()}
+        self.neighbour_rows = {}
+        for docname in self.path_to_page.values():
+            near = [i for n in neighbours[docname] if n != docname for i in rows.get(n, [])]
+            if near:
+                self.neighbour_rows[docname] = np.array(near)
+        logger.info(f"Mapped chunks to {len(self.page_rows)} pages")
+
+    def _resolve_page(self, page: Optional[str]) -> Optional[str]:
+        """Map the widget's page path (e.g. /amaranth/guide.html) to a docname."""
+        if not page or not self.path_to_page:
+            return None
+        path = page.split("?", 1)[0].split("#", 1)[0].lstrip("/")
+        if not path or path.endswith("/"):
+            path += "index.html"
+        # Drop leading segments in case the site is served below a prefix
+        parts = path.split("/")
+        for start in range(len(parts)):
+            docname = self.path_to_page.get("/".join(parts[start:]))
+            if docname is not None:
+                return docname
+        return None
+
+    async def _fetch_text(self, client: httpx.AsyncClient, url: str) -> str:
+        """
+        Fetch a docs artifact, preferring its precompressed ``.gz`` variant.
+
+        The last response body and ETag are cached on disk, so restarts send a
+        conditional GET and skip the download when nothing has changed.
+        Local paths are read directly, for offline index builds.
+        """
+        if "://" not in url:
+            return Path(url).read_text(encoding="utf-8")
+
+        cache_key = hashlib.sha256(url.encode()).hexdigest()
+        body_path = CACHE_DIR / f"{cache_key}.body"
+        etag_path = CACHE_DIR / f"{cache_key}.etag"
+
+        for candidate in (f"{url}.gz", url):
+            headers = {}
+            if body_path.exists() and etag_path.exists():
+                headers["If-None-Match"] = etag_path.read_text()
+
+            response = await client.get(candidate, headers=headers)
+            if response.status_code == 304:
+                logger.info(f"{candidate} not modified, using cached copy")
+                return body_path.read_bytes().decode("utf-8")
+            if response.status_code == 404 and candidate != url:
+                continue
             response.raise_for_status()
-            content = response.text
 
-        # Split into chunks (by section headers or fixed size)
-        self.chunks = self._chunk_content(content)
-        logger.info(f"Created {len(self.chunks)} chunks")
+            data = response.content
+            # Hosts that serve .gz files with Content-Encoding are already decoded
+            if data[:2] == b"\x1f\x8b":
+                data = gzip.decompress(data)
 
-        # Generate embeddings
-        self.embeddings = await self._generate_embeddings([c["text"] for c in self.chunks])
-        self.initialized = True
-        logger.info("Document store initialized")
+            etag = response.headers.get("ETag")
+            try:
+                CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                body_path.write_bytes(data)
+                if etag:
+                    etag_path.write_text(etag)
+                elif etag_path.exists():
+                    etag_path.unlink()
+            except OSError as e:
+                logger.warning(f"Could not cache {url}: {e}")
+
+            return data.decode("utf-8")
 
     def _chunk_content(self, content: str, chunk_size: int = 1500, overlap: int = 200) -> list[dict]:
         """Split content into overlapping chunks."""
@@ -139,53 +663,49 @@ class DocumentStore:
 
         return chunks
 
-    async def _generate_embeddings(self, texts: list[str]) -> np.ndarray:
-        """Generate embeddings using Vertex AI."""
-        from google.cloud import aiplatform
-        from vertexai.language_models import TextEmbeddingModel
-
-        aiplatform.init(project=GCP_PROJECT, location=GCP_LOCATION)
-        model = TextEmbeddingModel.from_pretrained(EMBEDDING_MODEL)
-
-        # Process in batches
-        all_embeddings = []
-        batch_size = 5
-
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            embeddings = model.get_embeddings(batch)
-            all_embeddings.extend([e.values for e in embeddings])
-
-        return np.array(all_embeddings)
-
-    async def search(self, query: str, top_k: int = 5) -> list[dict]:
-        """Search for relevant chunks."""
+    async def search(self, query: str, top_k: int = 5, page: Optional[str] = None) -> list[dict]:
+        """Search for relevant chunks, favouring the page the user is on."""
         if not self.initialized:
             raise RuntimeError("Document store not initialized")
 
         # Generate query embedding
-        from google.cloud import aiplatform
-        from vertexai.language_models import TextEmbeddingModel
-
-        aiplatform.init(project=GCP_PROJECT, location=GCP_LOCATION)
-        model = TextEmbeddingModel.from_pretrained(EMBEDDING_MODEL)
-
-        query_embedding = model.get_embeddings([query])[0].values
-        query_vec = np.array(query_embedding)
-
-        # Cosine similarity
-        similarities = np.dot(self.embeddings, query_vec) / (
-            np.linalg.norm(self.embeddings, axis=1) * np.linalg.norm(query_vec)
+        query_vec = np.asarray(await self.embedder.embed_query(query))
+        query_vec = query_vec / np.linalg.norm(query_vec)
+        docname = self._resolve_page(page)
+
+        # Cosine similarity (chunk embeddings are normalized at load time),
+        # computed concurrently over the routed shards only
+        shards = self._route(query_vec, docname)
+        scores = await asyncio.gather(
+            *(asyncio.to_thread(self._score_shard, shard, query_vec) for shard in shards)
         )
+        similarities = np.full(len(self.chunks), -np.inf)
+        for shard, shard_scores in zip(shards, scores):
+            similarities[shard.start:shard.stop] = shard_scores
+
+        # Rank chunks from the current page and its neighbours higher, so
+        # short context-dependent questions find the right section
+        ranking = similarities
+        if docname is not None:
+            ranking = similarities.copy()
+            if docname in self.neighbour_rows:
+                ranking[self.neighbour_rows[docname]] += NEIGHBOUR_BOOST
+            if docname in self.page_rows:
+                ranking[self.page_rows[docname]] += PAGE_BOOST
 
         # Get top-k
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
+        top_k = min(top_k, sum(shard.stop - shard.start for shard in shards))
+        if top_k <= 0:
+            return []
+        top_indices = np.argpartition(ranking, -top_k)[-top_k:]
+        top_indices = top_indices[np.argsort(ranking[top_indices])[::-1]]
 
         results = []
         for idx in top_indices:
             results.append({
                 "text": self.chunks[idx]["text"],
                 "title": self.chunks[idx]["title"],
+                "url": self.chunks[idx].get("url"),
                 "score": float(similarities[idx]),
             })
 
@@ -193,14 +713,17 @@ class DocumentStore:
 
 
 # Global document store
-doc_store = DocumentStore()
+doc_store = DocumentStore(make_embedding_provider())
+
+# Global session store
+session_store: SessionBackend = InMemorySessionBackend()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize document store on startup."""
     try:
-        await doc_store.initialize(DOCS_URL)
+        await doc_store.initialize(DOCS_URL, CHUNKS_URL, DOCS_INDEX_URL)
     except Exception as e:
         logger.error(f"Failed to initialize document store: {e}")
         # Continue without initialization - will fail gracefully on requests
@@ -231,6 +754,9 @@ async def health():
         "status": "healthy",
         "initialized": doc_store.initialized,
         "chunks": len(doc_store.chunks) if doc_store.initialized else 0,
+        "embedding_model": doc_store.embedder.name,
+        "index_version": doc_store.index_version,
+        "shards": {s.name: s.stop - s.start for s in doc_store.shards.values()},
     }
 
 
@@ -243,27 +769,26 @@ async def chat(request: ChatRequest):
             detail="Service initializing, please try again in a moment"
         )
 
+    # Resolve the conversation first: an expired session is retried by the client
+    session = await get_or_create_session(request.session_id, request.conversation_history)
+
     try:
         # Search for relevant context
-        results = await doc_store.search(request.question, top_k=5)
+        results = await doc_store.search(request.question, top_k=5, page=request.page)
 
         # Build context
         context_parts = []
         sources = []
         for r in results:
-            if r["score"] > 0.5:  # Only include relevant results
+            if r["score"] > RELEVANCE_THRESHOLD:  # Only include relevant results
                 context_parts.append(f"### {r['title']}\n{r['text']}")
                 if r["title"] not in sources:
                     sources.append(r["title"])
 
         context = "\n\n---\n\n".join(context_parts)
 
-        # Build conversation history
-        history_text = ""
-        if request.conversation_history:
-            for msg in request.conversation_history[-4:]:  # Last 4 messages
-                role = "User" if msg.get("role") == "user" else "Assistant"
-                history_text += f"{role}: {msg.get('content', '')}\n"
+        # Build conversation history from the server-side session
+        history_text = session.history_text()
 
         # Generate response using Gemini REST API
         prompt = f"""You are a helpful assistant for ChipFlow documentation. Answer the user's question based on the provided context from the documentation.
@@ -304,13 +829,27 @@ Answer:"""
             result = response.json()
             answer = result["candidates"][0]["content"]["parts"][0]["text"].strip()
 
-        return ChatResponse(answer=answer, sources=sources)
+        session.add_turn(request.question, answer)
+        await session_store.save(session)
+
+        return ChatResponse(answer=answer, sources=sources, session_id=session.id)
 
     except Exception as e:
         logger.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate response")
 
 
+@app.post("/api/session-turn", response_model=SessionTurnResponse)
+async def add_session_turn(request: SessionTurnRequest):
+    """Record a turn the widget answered from its local cache in the session."""
+    session = await session_store.get(request.session_id)
+    if session is None:
+        raise HTTPException(status_code=409, detail="Unknown or expired session")
+    session.add_turn(request.question, request.answer)
+    await session_store.save(session)
+    return SessionTurnResponse(session_id=session.id)
+
+
 @app.post("/api/request-support", response_model=SupportResponse)
 async def request_support(request: SupportRequest):
     """Send a support request email with conversation context."""
@@ -318,14 +857,16 @@ async def request_support(request: SupportRequest):
         logger.error("SMTP credentials not configured")
         raise HTTPException(status_code=503, detail="Support email not configured")
 
+    session = await session_store.get(request.session_id) if request.session_id else None
+    if request.session_id and session is None and not request.conversation_history:
+        raise HTTPException(status_code=409, detail="Unknown or expired session")
+
     try:
         # Format conversation history
         conversation_text = ""
-        if request.conversation_history:
-            conversation_text = "\n\n--- Conversation History ---\n"
-            for msg in request.conversation_history:
-                role = "User" if msg.get("role") == "user" else "Assistant"
-                conversation_text += f"\n{role}: {msg.get('content', '')}\n"
+        messages = session.transcript if session is not None else request.conversation_history
+        if messages:
+            conversation_text = "\n\n--- Conversation History ---\n" + format_transcript(messages)
 
         # Build email
         msg = MIMEMultipart()
@@ -11,6 +11,11 @@
   const CONFIG = {
     apiUrl: 'https://chipflow-docs-chat-ixzgvx6kya-uc.a.run.app/api/chat',
     supportUrl: 'https://chipflow-docs-chat-ixzgvx6kya-uc.a.run.app/api/request-support',
+    healthUrl: 'https://chipflow-docs-chat-ixzgvx6kya-uc.a.run.app/health',
+    sessionTurnUrl: 'https://chipflow-docs-chat-ixzgvx6kya-uc.a.run.app/api/session-turn',
+    cacheSize: 50,              // Answers kept in localStorage
+    cacheMaxAge: 86400000,      // 1 day, in ms
+    duplicateWindow: 2000,      // Ignore the same question resubmitted within this many ms
     projectName: 'ChipFlow',
     placeholder: 'Ask about ChipFlow docs...',
     welcomeMessage: 'Hi! I can help answer questions about ChipFlow documentation. What would you like to know?'
@@ -349,11 +354,167 @@
   const supportCancel = document.getElementById('cf-support-cancel');
   const supportSubmit = document.getElementById('cf-support-submit');
 
+  // Storage may be disabled (e.g. blocked third-party storage), in which case
+  // even accessing it throws; the widget then works without persistence
+  function readStorage(area, key) {
+    try {
+      return window[area].getItem(key);
+    } catch (e) {
+      return null;
+    }
+  }
+
+  function writeStorage(area, key, value) {
+    try {
+      if (value === null) {
+        window[area].removeItem(key);
+      } else {
+        window[area].setItem(key, value);
+      }
+    } catch (e) {
+      // Storage full or disabled: persistence is best effort
+    }
+  }
+
+  function loadHistory() {
+    try {
+      const history = JSON.parse(readStorage('sessionStorage', 'cf-chat-history'));
+      if (Array.isArray(history)) return history;
+    } catch (e) {
+      // Unreadable history: start over
+    }
+    return [];
+  }
+
+  function setSessionId(id) {
+    sessionId = id;
+    writeStorage('sessionStorage', 'cf-chat-session', id);
+  }
+
+  // POST with the session id, resending the history if the session expired
+  async function postWithSession(url, body) {
+    const post = (conversation) => fetch(url, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ...body, ...conversation })
+    });
+
+    if (!sessionId) {
+      return post({ conversation_history: conversationHistory });
+    }
+    const response = await post({ session_id: sessionId });
+    if (response.status !== 409) {
+      return response;
+    }
+    setSessionId(null);
+    return post({ conversation_history: conversationHistory });
+  }
+
   // State
   let isOpen = false;
   let isLoading = false;
   let isSupportFormOpen = false;
-  let conversationHistory = [];
+  // The backend keeps the conversation and we only send its session id. The
+  // local copy of the history is only sent if the session has expired.
+  let sessionId = readStorage('sessionStorage', 'cf-chat-session');
+  let conversationHistory = loadHistory();
+  // Resolves to the backend's index version (or null) once /health answers
+  let indexVersion = null;
+  let lastSubmit = { question: '', time: 0 };
+
+  // Add a turn answered from the cache to the server session, so follow-ups
+  // see it. Without a (live) session the next question starts a new one,
+  // seeded from the local history, which already includes the turn.
+  async function recordCachedTurn(question, answer) {
+    if (!sessionId) return;
+    try {
+      const response = await fetch(CONFIG.sessionTurnUrl, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ session_id: sessionId, question, answer })
+      });
+      if (!response.ok) setSessionId(null);
+    } catch (e) {
+      setSessionId(null);
+    }
+  }
+
+  // Keep the history manageable and across page loads
+  function saveHistory() {
+    if (conversationHistory.length > 10) {
+      conversationHistory = conversationHistory.slice(-10);
+    }
+    writeStorage('sessionStorage', 'cf-chat-history', JSON.stringify(conversationHistory));
+  }
+
+  // Wake the backend and learn its index version; called when the panel opens
+  function warmUp() {
+    if (!indexVersion) {
+      indexVersion = fetch(CONFIG.healthUrl)
+        .then(response => response.ok ? response.json() : null)
+        .then(data => (data && data.initialized && data.index_version) || null)
+        .catch(() => null)
+        .then(version => {
+          // Retry on the next open if the backend was not ready
+          if (!version) indexVersion = null;
+          return version;
+        });
+    }
+    return indexVersion;
+  }
+
+  // Answer cache, keyed by question and only valid for one index version.
+  // The page is left out of the key: it only nudges the ranking of chunks,
+  // and the point is to reuse an answer to a question asked on another page.
+  const CACHE_KEY = 'cf-chat-cache';
+
+  // Questions referring back to the conversation, or to "this" page, are
+  // never cached
+  const FOLLOW_UP_PATTERN = /^(and|but|so|also|what about|how about|why)\b|\b(it|its|this|that|these|those|they|them|their|above|previous|earlier|same|instead|else)\b/;
+
+  function normalizeQuestion(question) {
+    return question.toLowerCase().replace(/\s+/g, ' ').replace(/[?!.\s]+$/, '');
+  }
+
+  function isStandalone(question) {
+    return !FOLLOW_UP_PATTERN.test(normalizeQuestion(question));
+  }
+
+  function cacheKey(question) {
+    return normalizeQuestion(question);
+  }
+
+  function loadCache(version) {
+    try {
+      const cache = JSON.parse(readStorage('localStorage', CACHE_KEY));
+      if (cache && cache.version === version) return cache;
+    } catch (e) {
+      // Unreadable cache: start over
+    }
+    return { version, entries: {} };
+  }
+
+  function getCachedAnswer(version, question) {
+    const entry = loadCache(version).entries[cacheKey(question)];
+    if (entry && Date.now() - entry.time < CONFIG.cacheMaxAge) return entry;
+    return null;
+  }
+
+  function cacheAnswer(version, question, data) {
+    const cache = loadCache(version);
+    cache.entries[cacheKey(question)] = {
+      answer: data.answer,
+      sources: data.sources || [],
+      time: Date.now()
+    };
+    // Drop the oldest entries beyond the size limit
+    const keys = Object.keys(cache.entries)
+      .sort((a, b) => cache.entries[b].time - cache.entries[a].time);
+    for (const key of keys.slice(CONFIG.cacheSize)) {
+      delete cache.entries[key];
+    }
+    writeStorage('localStorage', CACHE_KEY, JSON.stringify(cache));
+  }
 
   // Add welcome message
   function addWelcomeMessage() {
@@ -374,6 +535,7 @@
     isOpen = !isOpen;
     chatModal.classList.toggle('open', isOpen);
     if (isOpen) {
+      warmUp();
       addWelcomeMessage();
       inputField.focus();
       trackChatEvent('ai_chat_opened', { page: window.location.pathname });
@@ -423,6 +585,14 @@
     const question = inputField.value.trim();
     if (!question || isLoading) return;
 
+    // Debounce double submits of the same question
+    const now = Date.now();
+    if (normalizeQuestion(question) === lastSubmit.question &&
+        now - lastSubmit.time < CONFIG.duplicateWindow) {
+      return;
+    }
+    lastSubmit = { question: normalizeQuestion(question), time: now };
+
     isLoading = true;
     sendBtn.disabled = true;
     inputField.value = '';
@@ -438,14 +608,26 @@
     });
 
     try {
-      const response = await fetch(CONFIG.apiUrl, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          question,
-          conversation_history: conversationHistory,
-          page: window.location.pathname
-        })
+      // Only standalone questions can be answered from the cache; follow-ups
+      // depend on the conversation so far or the page
+      const version = isStandalone(question) ? await warmUp() : null;
+      const cached = version && getCachedAnswer(version, question);
+      if (cached) {
+        removeLoading();
+        addMessage(cached.answer, 'assistant');
+        trackChatEvent('ai_chat_cache_hit', { page: window.location.pathname });
+        conversationHistory.push(
+          { role: 'user', content: question },
+          { role: 'assistant', content: cached.answer }
+        );
+        saveHistory();
+        await recordCachedTurn(question, cached.answer);
+        return;
+      }
+
+      const response = await postWithSession(CONFIG.apiUrl, {
+        question,
+        page: window.location.pathname
       });
 
       removeLoading();
@@ -457,6 +639,14 @@
       const data = await response.json();
       addMessage(data.answer, 'assistant');
 
+      if (version) {
+        cacheAnswer(version, question, data);
+      }
+
+      if (data.session_id) {
+        setSessionId(data.session_id);
+      }
+
       // Track successful response
       trackChatEvent('ai_chat_response', {
         response_length: data.answer.length,
@@ -469,10 +659,7 @@
         { role: 'assistant', content: data.answer }
       );
 
-      // Keep history manageable
-      if (conversationHistory.length > 10) {
-        conversationHistory = conversationHistory.slice(-10);
-      }
+      saveHistory();
 
     } catch (error) {
       removeLoading();
@@ -523,16 +710,11 @@
     supportSubmit.textContent = 'Sending...';
 
     try {
-      const response = await fetch(CONFIG.supportUrl, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          email,
-          subject,
-          message,
-          conversation_history: conversationHistory,
-          page: window.location.pathname
-        })
+      const response = await postWithSession(CONFIG.supportUrl, {
+        email,
+        subject,
+        message,
+        page: window.location.pathname
       });
 
       if (!response.ok) {
@@ -562,6 +744,17 @@
     }
   }
 
+  // Show the conversation carried over from earlier pages, so the user sees
+  // the context the backend answers with. A session without a visible
+  // history is not continued.
+  if (conversationHistory.length) {
+    for (const msg of conversationHistory) {
+      addMessage(msg.content, msg.role === 'user' ? 'user' : 'assistant');
+    }
+  } else if (sessionId) {
+    setSessionId(null);
+  }
+
   // Event listeners
   chatBtn.addEventListener('click', toggleChat);
   closeBtn.addEventListener('click', toggleChat);
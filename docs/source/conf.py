@@ -7,7 +7,7 @@ from itertools import starmap
 top_path = Path('../../')
 sys.path.append(str((top_path / 'tools').absolute()))
 
-from copy_docs import copy_docs
+from copy_docs import copy_docs, Rewrite
 
 # Repos we will be assembling
 repos = [
@@ -17,8 +17,38 @@ repos = [
     ('chipflow/chipflow-digital-ip', 'origin/main')
 ]
 
+# Extra rewrites applied while copying, on top of the :doc: role renames
+doc_rewrites = {
+    # Point chipflow-lib/index.rst at the platform-api.rst outside chipflow-lib/
+    'chipflow-lib': [Rewrite('platform-api', '/platform-api', 'index.rst')],
+}
+
+# Override chipflow-lib/platform-api.rst with a version that has correct
+# toctree paths (the vendor version has broken cross-references)
+doc_overrides = {
+    'chipflow-lib': {
+        'platform-api.rst': """\
+Platform API Reference
+======================
+
+This section provides the API reference for the ChipFlow platform library.
+
+.. toctree::
+   :maxdepth: 3
+
+   /chipflow-lib/autoapi/chipflow/index
+""",
+    },
+}
+
+# Files generated into the copied doc directories during the build, which
+# copy_docs must leave in place (the AutoAPI output, see autoapi_root below)
+doc_keep = {
+    'chipflow-lib': ['autoapi/**'],
+}
+
 # copy in the doc sources from our repos
-repo_list = copy_docs(repos)
+repo_list = copy_docs(repos, doc_rewrites, doc_overrides, keep=doc_keep)
 
 # add our repos to path
 for r in repo_list:
@@ -27,7 +57,8 @@ for r in repo_list:
 
 # Create platform-api.rst in docs/source/ (outside chipflow-lib to avoid copy_docs overwriting)
 # This file points to the autoapi-generated index
-Path('platform-api.rst').write_text("""Platform API Reference
+platform_api = Path('platform-api.rst')
+platform_api_content = """Platform API Reference
 ======================
 
 This section provides the API reference for the ChipFlow platform library.
@@ -36,14 +67,10 @@ This section provides the API reference for the ChipFlow platform library.
    :maxdepth: 3
 
    chipflow-lib/autoapi/chipflow/index
-""")
-
-# Update chipflow-lib/index.rst to point to the platform-api.rst outside chipflow-lib/
-chipflow_lib_index = Path('chipflow-lib/index.rst')
-if chipflow_lib_index.exists():
-    content = chipflow_lib_index.read_text()
-    content = content.replace('platform-api', '/platform-api')
-    chipflow_lib_index.write_text(content)
+"""
+# Only write when changed, so Sphinx doesn't reread it on every build
+if not platform_api.exists() or platform_api.read_text() != platform_api_content:
+    platform_api.write_text(platform_api_content)
 
 # -- Project information
 
@@ -71,9 +98,12 @@ extensions = [
     'sphinxcontrib.yowasp_wavedrom',
     'sphinxext.rediraffe',
     'autoapi.extension',
+    'sphinx_autoapi_cache',
     'sphinx_design',
     'sphinx_llm.txt',
     'sphinx_json_index',
+    'sphinx_chunks',
+    'sphinx_precompress',
     'sphinx_llms_enhancements',
 ]
 
@@ -1,2 +1,2 @@
-from .copy_docs import copy_docs
-__all__=['copy_docs']
+from .copy_docs import copy_docs, sync_docs, Rewrite
+__all__=['copy_docs', 'sync_docs', 'Rewrite']
@@ -6,9 +6,154 @@ import os
 import subprocess
 import re
 import glob
+import json
 import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Records what each copied file was built from, so unchanged files are skipped
+MANIFEST_NAME = '.copy_docs.json'
+
+
+class Rewrite(NamedTuple):
+    """A literal text replacement applied to copied files matching ``pattern``."""
+    old: str
+    new: str
+    pattern: str = '*.rst'
+
+
+class SyncSummary(NamedTuple):
+    rewritten: int = 0
+    copied: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+    def __str__(self):
+        return (f"{self.rewritten} rewritten, {self.copied} copied, "
+                f"{self.unchanged} unchanged, {self.removed} removed")
+
+
+@lru_cache(maxsize=None)
+def _compile_rewrites(rewrites: Tuple[Rewrite, ...]) -> Tuple[re.Pattern, Dict[str, str]]:
+    """Combine rewrites into one pattern so each file is rewritten in a single pass."""
+    replacements = {r.old: r.new for r in rewrites}
+    # Longest first, so overlapping rules prefer the most specific match
+    olds = sorted(replacements, key=len, reverse=True)
+    return re.compile('|'.join(re.escape(old) for old in olds)), replacements
+
+
+def _sync_file(src: Path, dest: Path, rewrites: Tuple[Rewrite, ...],
+               override: Optional[str], previous: Optional[str]) -> Tuple[str, str]:
+    """Bring one destination file up to date, returning (status, fingerprint)."""
+    data = src.read_bytes()
+    digest = hashlib.sha256(data)
+    digest.update(repr((rewrites, override)).encode('utf-8'))
+    fingerprint = digest.hexdigest()
+
+    if fingerprint == previous and dest.exists():
+        return 'unchanged', fingerprint
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if override is not None:
+        dest.write_text(override, encoding='utf-8')
+        return 'rewritten', fingerprint
+
+    if rewrites:
+        try:
+            content = data.decode('utf-8')
+        except UnicodeDecodeError:
+            content = None
+        if content is not None:
+            pattern, replacements = _compile_rewrites(rewrites)
+            new_content = pattern.sub(lambda m: replacements[m.group(0)], content)
+            if new_content != content:
+                dest.write_text(new_content, encoding='utf-8')
+                return 'rewritten', fingerprint
+
+    # Keep the source mtime so Sphinx doesn't see untouched files as changed
+    shutil.copy2(src, dest)
+    return 'copied', fingerprint
+
+
+def sync_docs(src_dir: Path, dest_dir: Path, rewrites: List[Rewrite],
+              overrides: Optional[Dict[str, str]] = None,
+              jobs: Optional[int] = None,
+              keep: Optional[List[str]] = None) -> SyncSummary:
+    """
+    Mirror ``src_dir`` into ``dest_dir``, applying rewrites in one pass per file.
+
+    Files are processed in a thread pool. A fingerprint of each source file and
+    the rules applied to it is kept in a manifest in ``dest_dir``; files whose
+    fingerprint is unchanged are left untouched (keeping their mtimes, so
+    Sphinx doesn't reread them). Files no longer in ``src_dir`` are removed,
+    unless they match one of the ``keep`` patterns.
+
+    Args:
+        src_dir: Directory to copy from
+        dest_dir: Directory to copy to
+        rewrites: Replacements to apply to matching files
+        overrides: Replacement contents for specific files, keyed by path
+            relative to ``src_dir``
+        jobs: Number of worker threads (defaults to the CPU count)
+        keep: Glob patterns, relative to ``dest_dir``, of files generated
+            there by the build (e.g. ``autoapi/**``) that must not be removed
+
+    Returns:
+        Counts of rewritten, copied, unchanged and removed files
+    """
+    overrides = overrides or {}
+    keep = keep or []
+    manifest_path = dest_dir / MANIFEST_NAME
+    try:
+        previous = json.loads(manifest_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        previous = {}
+
+    sources = {}
+    for root, _, files in src_dir.walk(on_error=print):
+        for f in files:
+            src = root / f
+            sources[src.relative_to(src_dir).as_posix()] = src
+
+    def sync(rel: str) -> Tuple[str, str]:
+        file_rewrites = tuple(r for r in rewrites if fnmatch(rel, r.pattern))
+        return _sync_file(sources[rel], dest_dir / rel, file_rewrites,
+                          overrides.get(rel), previous.get(rel))
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        results = dict(zip(sources, pool.map(sync, sources)))
+
+    # Remove files that are no longer in the source, then empty directories
+    removed = 0
+    if dest_dir.exists():
+        for root, dirs, files in dest_dir.walk(top_down=False):
+            for f in files:
+                path = root / f
+                rel = path.relative_to(dest_dir).as_posix()
+                if (rel not in sources and rel != MANIFEST_NAME
+                        and not any(fnmatch(rel, pattern) for pattern in keep)):
+                    path.unlink()
+                    removed += 1
+            if root != dest_dir and not any(root.iterdir()):
+                root.rmdir()
+
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(
+        json.dumps({rel: fingerprint for rel, (_, fingerprint) in results.items()}),
+        encoding='utf-8'
+    )
+
+    statuses = [status for status, _ in results.values()]
+    return SyncSummary(
+        rewritten=statuses.count('rewritten'),
+        copied=statuses.count('copied'),
+        unchanged=statuses.count('unchanged'),
+        removed=removed,
+    )
 
 
 def has_local_changes(repodir: Path) -> bool:
@@ -35,7 +180,11 @@ def has_local_changes(repodir: Path) -> bool:
     return False
 
 
-def copy_docs(repos: List[Tuple[str, str]]) -> List[Path]:
+def copy_docs(repos: List[Tuple[str, str]],
+              rewrites: Optional[Dict[str, List[Rewrite]]] = None,
+              overrides: Optional[Dict[str, Dict[str, str]]] = None,
+              jobs: Optional[int] = None,
+              keep: Optional[Dict[str, List[str]]] = None) -> List[Path]:
     """"
     Pull in docs from other repos.
 
@@ -44,10 +193,19 @@ def copy_docs(repos: List[Tuple[str, str]]) -> List[Path]:
 
     Args:
         repos: List of tuples containing git repo and ref
+        rewrites: Extra rewrites to apply, keyed by repo name
+        overrides: Replacement file contents, keyed by repo name and then by
+            path relative to the repo's docs directory
+        jobs: Number of worker threads used to copy each repo's docs
+        keep: Patterns of generated files to keep in each repo's docs copy,
+            keyed by repo name (see ``sync_docs``)
 
     Returns:
         A list of the repo locations
     """
+    rewrites = rewrites or {}
+    overrides = overrides or {}
+    keep = keep or {}
 
     # Ensure vendor directory exists
     root_path = Path(os.environ['PDM_PROJECT_ROOT'])
@@ -85,47 +243,11 @@ def copy_docs(repos: List[Tuple[str, str]]) -> List[Path]:
 
         repo_list.append(repodir)
 
-        print(f"Binding in {repo_path} docs as {name}")
-
-        if docs_dest_path.exists():
-            shutil.rmtree(docs_dest_path)
-
-        shutil.copytree(repodir / 'docs', docs_dest_path)
-
         # Replace :doc: references with :{name}: in all rst files
-        doc_files = []
-        for root, _, files in docs_dest_path.walk(on_error=print):
-            rst_files = filter(lambda f: (root / f).suffix == '.rst' , files)
-            for file in (root/f for f in rst_files):
-                try:
-                    content = file.read_text(encoding='utf-8')
-
-                    if ':doc:' in content:
-                        # Replace :doc: with :name:
-                        new_content = content.replace(':doc:', f':{name}:')
-                        file.write_text(new_content, encoding='utf-8')
-                        print(f"Updated references in {file}")
-                except (UnicodeDecodeError, IsADirectoryError):
-                    # Skip binary files or directories
-                    pass
-
-    # Override chipflow-lib/platform-api.rst with our custom version that has
-    # correct toctree paths (the vendor version has broken cross-references)
-    platform_api_path = root_path / 'docs/source/chipflow-lib/platform-api.rst'
-    if platform_api_path.exists():
-        platform_api_content = """\
-Platform API Reference
-======================
-
-This section provides the API reference for the ChipFlow platform library.
-
-.. toctree::
-   :maxdepth: 3
-
-   /chipflow-lib/autoapi/chipflow/index
-"""
-        platform_api_path.write_text(platform_api_content, encoding='utf-8')
-        print(f"Replaced {platform_api_path} with custom version")
+        repo_rewrites = [Rewrite(':doc:', f':{name}:')] + list(rewrites.get(name, []))
+        summary = sync_docs(repodir / 'docs', docs_dest_path, repo_rewrites,
+                            overrides.get(name), jobs, keep.get(name))
+        print(f"Binding in {repo_path} docs as {name}: {summary}")
 
     print("Documentation copy completed successfully")
 
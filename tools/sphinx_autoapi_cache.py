@@ -0,0 +1,192 @@
+"""
+Sphinx extension to cache the sphinx-autoapi output between builds.
+
+copy_docs leaves the generated autoapi tree in place between builds (see
+``doc_keep`` in conf.py), but a fresh checkout or CI runner starts without it,
+and a re-cloned vendored repository gets new source mtimes; either way AutoAPI
+parses the package and renders every ``.rst`` file again even though nothing
+changed.
+
+This extension keys the generated tree on the resolved commit of the repository
+containing ``autoapi_dirs``, a hash of the autoapi template directory and the
+autoapi options. When the key matches the cached copy, the tree is restored
+with its original mtimes (so Sphinx rereads none of it) and, if the environment
+already holds AutoAPI's parsed objects, AutoAPI's parse and render steps are
+skipped. Otherwise AutoAPI runs as usual and its output is cached afterwards.
+Repositories with uncommitted changes are never cached.
+"""
+import hashlib
+import json
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Optional
+from sphinx.application import Sphinx
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_FILENAME = "key"
+TREE_DIRNAME = "tree"
+
+
+def _git(repodir: Path, *args: str) -> Optional[str]:
+    result = subprocess.run(
+        ['git', '-C', repodir, *args],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+
+def hash_directory(path: Path) -> str:
+    """Hash the relative paths and contents of all files below ``path``."""
+    digest = hashlib.sha256()
+    if path.is_dir():
+        for file in sorted(p for p in path.rglob('*') if p.is_file()):
+            digest.update(file.relative_to(path).as_posix().encode('utf-8'))
+            digest.update(b'\0')
+            digest.update(file.read_bytes())
+            digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def autoapi_cache_key(app: Sphinx, repodir: Path) -> Optional[str]:
+    """Return the cache key for the current autoapi inputs, or None if uncacheable."""
+    commit = _git(repodir, 'rev-parse', 'HEAD')
+    if commit is None:
+        return None
+    if _git(repodir, 'status', '--porcelain'):
+        logger.info(f"[autoapi-cache] {repodir} has local changes, not caching")
+        return None
+
+    config = app.config
+    template_dir = Path(app.srcdir) / config.autoapi_template_dir if config.autoapi_template_dir else None
+
+    try:
+        from importlib.metadata import version
+        autoapi_version = version('sphinx-autoapi')
+    except Exception:
+        autoapi_version = ""
+
+    key_data = {
+        "commit": commit,
+        "templates": hash_directory(template_dir) if template_dir else "",
+        "autoapi_version": autoapi_version,
+        "options": list(config.autoapi_options or []),
+        "ignore": list(config.autoapi_ignore or []),
+        "file_patterns": list(config.autoapi_file_patterns or []),
+        "own_page_level": config.autoapi_own_page_level,
+        "dirs": [str(d) for d in config.autoapi_dirs],
+    }
+    return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _resolve(app: Sphinx):
+    """Return (repodir, cache_dir, autoapi_root) for the configured autoapi_dirs."""
+    if not app.config.autoapi_dirs:
+        return None
+    source_dir = Path(app.srcdir) / app.config.autoapi_dirs[0]
+    toplevel = _git(source_dir, 'rev-parse', '--show-toplevel')
+    if toplevel is None:
+        return None
+    repodir = Path(toplevel)
+
+    if app.config.autoapi_cache_dir:
+        cache_dir = Path(app.srcdir) / app.config.autoapi_cache_dir
+    else:
+        cache_dir = repodir.parent / '.autoapi-cache' / repodir.name
+
+    autoapi_root = Path(app.srcdir) / app.config.autoapi_root
+    return repodir, cache_dir, autoapi_root
+
+
+def restore_autoapi_tree(app: Sphinx, config) -> None:
+    """Restore the cached autoapi tree and skip rendering if the inputs are unchanged."""
+    app.autoapi_cache_key = None
+    app.autoapi_cache_hit = False
+    if 'autoapi.extension' not in app.extensions or not config.autoapi_generate_api_docs:
+        return
+
+    resolved = _resolve(app)
+    if resolved is None:
+        return
+    repodir, cache_dir, autoapi_root = resolved
+
+    key = autoapi_cache_key(app, repodir)
+    app.autoapi_cache_key = key
+    if key is None:
+        return
+
+    key_path = cache_dir / KEY_FILENAME
+    tree_path = cache_dir / TREE_DIRNAME
+    if not (key_path.exists() and tree_path.is_dir()
+            and key_path.read_text(encoding='utf-8').strip() == key):
+        logger.info("[autoapi-cache] No cached autoapi output for these inputs")
+        return
+
+    if autoapi_root.exists():
+        shutil.rmtree(autoapi_root)
+    # copy2 keeps the mtimes of the cached files, so Sphinx sees them as unchanged
+    shutil.copytree(tree_path, autoapi_root, copy_function=shutil.copy2)
+    app.autoapi_cache_key = None
+    app.autoapi_cache_hit = True
+    logger.info(f"[autoapi-cache] Restored autoapi output for {repodir.name} from {cache_dir}")
+
+
+def sync_autoapi_state(app: Sphinx) -> None:
+    """
+    Steer AutoAPI's own reload check (runs before AutoAPI's builder-inited).
+
+    AutoAPI reloads only when its source files' mtimes are newer than at the
+    last build. On a cache miss it must render, since copy_docs removed the
+    previous tree; on a hit with parsed objects already in the environment the
+    sources are at the same commit, so re-parsing (e.g. after a fresh clone
+    with new mtimes) is unnecessary.
+    """
+    env = app.env
+    if getattr(app, 'autoapi_cache_key', None) is not None:
+        env.autoapi_max_mtime = 0
+    elif getattr(app, 'autoapi_cache_hit', False) and hasattr(env, 'autoapi_all_objects'):
+        files = getattr(env, 'autoapi_source_files', [])
+        try:
+            env.autoapi_max_mtime = max(Path(path).stat().st_mtime for _, path in files)
+        except (OSError, ValueError):
+            pass
+
+
+def store_autoapi_tree(app: Sphinx) -> None:
+    """Cache the tree AutoAPI just rendered (runs after AutoAPI's builder-inited)."""
+    key = getattr(app, 'autoapi_cache_key', None)
+    if key is None:
+        return
+
+    _, cache_dir, autoapi_root = _resolve(app)
+    if not autoapi_root.is_dir():
+        return
+
+    if cache_dir.exists():
+        shutil.rmtree(cache_dir)
+    cache_dir.mkdir(parents=True)
+    shutil.copytree(autoapi_root, cache_dir / TREE_DIRNAME, copy_function=shutil.copy2)
+    (cache_dir / KEY_FILENAME).write_text(key + "\n", encoding='utf-8')
+    logger.info(f"[autoapi-cache] Cached autoapi output in {cache_dir}")
+
+
+def setup(app: Sphinx):
+    # Where to keep the cached tree (relative to the source dir); by default
+    # next to the vendored repository
+    app.add_config_value('autoapi_cache_dir', None, '')
+
+    app.connect('config-inited', restore_autoapi_tree)
+    # AutoAPI renders its files in builder-inited at the default priority
+    app.connect('builder-inited', sync_autoapi_state, priority=400)
+    app.connect('builder-inited', store_autoapi_tree, priority=600)
+
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
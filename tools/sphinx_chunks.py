@@ -0,0 +1,293 @@
+"""
+Sphinx extension to export retrieval-ready chunks of documentation.
+
+This extension walks each resolved doctree while pages are written and splits
+it into chunks of prose, code, API signatures and tables. Every chunk carries
+its page URL (including the section anchor), the full section path and its
+type, so retrieval tools such as the chat backend can load structured chunks
+directly instead of re-parsing llms-full.txt.
+
+Chunks are extracted in the (parallel) write phase into one file per document
+under the doctree directory, so incremental builds only re-chunk rewritten
+pages. At the end of the build they are gathered into sharded JSONL files in
+``chunks/`` with a ``manifest.json`` describing the shards.
+"""
+import json
+import shutil
+from pathlib import Path
+from docutils import nodes
+from sphinx import addnodes
+from sphinx.application import Sphinx
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+CHUNKS_DIRNAME = "chunks"
+MANIFEST_FILENAME = "manifest.json"
+
+# Nodes that carry no retrievable content
+SKIPPED_NODES = (
+    nodes.comment,
+    nodes.system_message,
+    nodes.target,
+    nodes.substitution_definition,
+    addnodes.toctree,
+    addnodes.index,
+)
+
+
+class ChunkCollector:
+    """Split a resolved doctree into typed chunks."""
+
+    def __init__(self, docname: str, page_url: str, max_chars: int):
+        self.docname = docname
+        self.page_url = page_url
+        self.max_chars = max_chars
+        self.chunks: list[dict] = []
+        self._prose: list[str] = []
+        self._prose_size = 0
+        self._section_path: list[str] = []
+        self._anchor = ""
+
+    def collect(self, doctree: nodes.document) -> list[dict]:
+        self._visit_children(doctree)
+        self._flush_prose()
+        return self.chunks
+
+    def _emit(self, chunk_type: str, text: str) -> None:
+        text = text.strip()
+        if not text:
+            return
+        url = f"{self.page_url}#{self._anchor}" if self._anchor else self.page_url
+        self.chunks.append({
+            "id": f"{self.docname}#{len(self.chunks)}",
+            "docname": self.docname,
+            "url": url,
+            "section": list(self._section_path),
+            "type": chunk_type,
+            "text": text,
+        })
+
+    def _flush_prose(self) -> None:
+        if self._prose:
+            self._emit("prose", "\n\n".join(self._prose))
+        self._prose = []
+        self._prose_size = 0
+
+    def _add_prose(self, text: str) -> None:
+        text = text.strip()
+        if not text:
+            return
+        if self._prose and self._prose_size + len(text) > self.max_chars:
+            self._flush_prose()
+        self._prose.append(text)
+        self._prose_size += len(text) + 2
+
+    def _visit_children(self, node: nodes.Element) -> None:
+        for child in node.children:
+            self._visit(child)
+
+    def _visit(self, node: nodes.Node) -> None:
+        if isinstance(node, SKIPPED_NODES):
+            return
+        if isinstance(node, nodes.section):
+            self._visit_section(node)
+        elif isinstance(node, nodes.title):
+            # Section titles are recorded in the section path
+            return
+        elif isinstance(node, nodes.literal_block):
+            self._flush_prose()
+            self._emit("code", node.astext())
+        elif isinstance(node, nodes.table):
+            self._flush_prose()
+            self._emit("table", node.astext())
+        elif isinstance(node, addnodes.desc):
+            self._flush_prose()
+            self._visit_desc(node)
+        elif isinstance(node, nodes.compound) and 'toctree-wrapper' in node['classes']:
+            return
+        elif isinstance(node, (nodes.container, nodes.compound, nodes.block_quote)):
+            self._visit_children(node)
+        else:
+            self._add_prose(node.astext())
+
+    def _visit_section(self, section: nodes.section) -> None:
+        self._flush_prose()
+        title = section.next_node(nodes.title)
+        saved_anchor = self._anchor
+        self._section_path.append(title.astext() if title is not None else "")
+        if section['ids']:
+            self._anchor = section['ids'][0]
+        self._visit_children(section)
+        self._flush_prose()
+        self._section_path.pop()
+        self._anchor = saved_anchor
+
+    def _split_desc_content(self, node: nodes.Element, parts: list[str],
+                            nested: list[addnodes.desc]) -> None:
+        """Collect the text of a description's content and its nested descriptions."""
+        for child in node.children:
+            if isinstance(child, SKIPPED_NODES):
+                continue
+            if isinstance(child, addnodes.desc):
+                nested.append(child)
+            elif isinstance(child, (nodes.section, nodes.container, nodes.compound)):
+                # Docstring sections and wrappers may hold member descriptions
+                self._split_desc_content(child, parts, nested)
+            else:
+                text = child.astext().strip()
+                if text:
+                    parts.append(text)
+
+    def _emit_api(self, signature: str, parts: list[str]) -> None:
+        """
+        Emit a description as one or more chunks of at most ``max_chars``.
+
+        Each chunk starts with the signature for context. Parts longer than the
+        room left next to it are cut at the last newline (or space), or
+        hard-cut if they have neither; a very long signature still gets at least half of
+        ``max_chars`` of text per chunk.
+        """
+        header = signature + "\n\n" if signature else ""
+        room = max(self.max_chars - len(header), self.max_chars // 2, 1)
+
+        pieces = []
+        for part in parts:
+            while len(part) > room:
+                cut = part.rfind("\n", 1, room)
+                if cut == -1:
+                    cut = part.rfind(" ", 1, room)
+                if cut == -1:
+                    cut = room
+                pieces.append(part[:cut].strip())
+                # cut >= 1, so the remainder always shrinks
+                part = part[cut:].strip()
+            pieces.append(part)
+
+        body = ""
+        for piece in filter(None, pieces):
+            if body and len(body) + 2 + len(piece) > room:
+                self._emit("api", header + body)
+                body = ""
+            body = f"{body}\n\n{piece}" if body else piece
+        self._emit("api", header + body)
+
+    def _visit_desc(self, desc: addnodes.desc) -> None:
+        saved_anchor = self._anchor
+        signatures = [sig for sig in desc.children if isinstance(sig, addnodes.desc_signature)]
+        for sig in signatures:
+            if sig['ids']:
+                self._anchor = sig['ids'][0]
+                break
+        signature = "\n".join(sig.astext() for sig in signatures)
+
+        # Nested descriptions (e.g. class members) become their own chunks
+        parts: list[str] = []
+        nested: list[addnodes.desc] = []
+        for content in desc.children:
+            if isinstance(content, addnodes.desc_content):
+                self._split_desc_content(content, parts, nested)
+
+        self._emit_api(signature, parts)
+        for child in nested:
+            self._visit_desc(child)
+        self._anchor = saved_anchor
+
+
+def chunk_cache_dir(app: Sphinx) -> Path:
+    return Path(app.doctreedir) / CHUNKS_DIRNAME
+
+
+def export_page_chunks(app: Sphinx, pagename: str, templatename: str,
+                       context: dict, doctree) -> None:
+    """Write the chunks of one page to the chunk cache (runs in write workers)."""
+    if doctree is None or pagename not in app.env.found_docs:
+        return
+
+    page_url = app.builder.get_target_uri(pagename)
+    if app.config.html_baseurl:
+        page_url = app.config.html_baseurl.rstrip('/') + '/' + page_url
+
+    chunks = ChunkCollector(pagename, page_url, app.config.chunks_max_chars).collect(doctree)
+    title_node = app.env.titles.get(pagename)
+    title = title_node.astext() if title_node is not None else pagename
+    for chunk in chunks:
+        chunk["title"] = title
+
+    cache_path = chunk_cache_dir(app) / f"{pagename}.jsonl"
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False))
+            f.write("\n")
+
+
+def write_chunk_shards(app: Sphinx, exception) -> None:
+    """Gather per-page chunks into sharded JSONL files after the build."""
+    if exception:
+        return
+
+    if app.builder.name not in ('html', 'dirhtml'):
+        return
+
+    cache_dir = chunk_cache_dir(app)
+    outdir = Path(app.outdir) / CHUNKS_DIRNAME
+    if outdir.exists():
+        shutil.rmtree(outdir)
+    outdir.mkdir(parents=True)
+
+    shard_size = max(1, app.config.chunks_shard_size)
+    shards = []
+    shard_file = None
+    shard_count = 0
+    total = 0
+
+    try:
+        for docname in sorted(app.env.found_docs):
+            cache_path = cache_dir / f"{docname}.jsonl"
+            if not cache_path.exists():
+                continue
+            for line in cache_path.read_text(encoding='utf-8').splitlines():
+                if shard_file is None or shard_count >= shard_size:
+                    if shard_file is not None:
+                        shard_file.close()
+                        shards[-1]["chunks"] = shard_count
+                    name = f"chunks-{len(shards):05d}.jsonl"
+                    shards.append({"path": name, "chunks": 0})
+                    shard_file = open(outdir / name, 'w', encoding='utf-8')
+                    shard_count = 0
+                shard_file.write(line)
+                shard_file.write("\n")
+                shard_count += 1
+                total += 1
+    finally:
+        if shard_file is not None:
+            shard_file.close()
+            shards[-1]["chunks"] = shard_count
+
+    manifest = {
+        "project": app.config.project,
+        "version": app.config.version,
+        "chunks": total,
+        "shards": shards,
+    }
+    with open(outdir / MANIFEST_FILENAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    logger.info(f"Exported {total} chunks in {len(shards)} shards to {outdir}")
+
+
+def setup(app: Sphinx):
+    # Maximum size of a prose chunk, in characters
+    app.add_config_value('chunks_max_chars', 1500, 'html')
+    # Maximum number of chunks per JSONL shard
+    app.add_config_value('chunks_shard_size', 2000, 'html')
+
+    app.connect('html-page-context', export_page_chunks)
+    app.connect('build-finished', write_chunk_shards)
+
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -5,14 +5,86 @@ This extension generates a docs-index.json file that provides machine-readable
 metadata about all documentation pages, including titles, paths, and navigation
 structure. This is useful for AI agents and tools that need to understand the
 documentation structure programmatically.
+
+Each page entry also carries a content hash, the size of the built page and a
+heading outline. Hashes and outlines are collected while documents are read,
+so only re-read pages are recomputed on an incremental build.
+
+There is deliberately no modification time: CI builds from scratch and the
+vendored docs are freshly cloned, so no timestamp available here survives
+between builds. Consumers should instead compare each page's ``hash`` with
+the one they saw last to fetch just the pages that changed.
 """
+import hashlib
 import json
 from pathlib import Path
+from docutils import nodes
 from sphinx.application import Sphinx
 from sphinx.util import logging
 
 logger = logging.getLogger(__name__)
 
+INDEX_FILENAME = "docs-index.json"
+NO_TITLE = "<no title>"
+
+
+def collect_page_metadata(app: Sphinx, doctree: nodes.document) -> None:
+    """Record the content hash and heading outline of a freshly read document."""
+    env = app.env
+    if not hasattr(env, 'json_index_pages'):
+        env.json_index_pages = {}
+
+    outline = []
+    for section in doctree.findall(nodes.section):
+        title = section.next_node(nodes.title)
+        if title is None:
+            continue
+        level = 0
+        parent = section.parent
+        while parent is not None:
+            if isinstance(parent, nodes.section):
+                level += 1
+            parent = parent.parent
+        outline.append({
+            "title": title.astext(),
+            "anchor": section['ids'][0] if section['ids'] else "",
+            "level": level,
+        })
+
+    content_hash = hashlib.sha256(doctree.astext().encode('utf-8')).hexdigest()
+    env.json_index_pages[env.docname] = {
+        "hash": content_hash,
+        "outline": outline,
+    }
+
+
+def purge_page_metadata(app: Sphinx, env, docname: str) -> None:
+    if hasattr(env, 'json_index_pages'):
+        env.json_index_pages.pop(docname, None)
+
+
+def merge_page_metadata(app: Sphinx, env, docnames, other) -> None:
+    """Merge metadata collected by parallel read workers."""
+    if not hasattr(env, 'json_index_pages'):
+        env.json_index_pages = {}
+    if hasattr(other, 'json_index_pages'):
+        for docname in docnames:
+            if docname in other.json_index_pages:
+                env.json_index_pages[docname] = other.json_index_pages[docname]
+
+
+def load_previous_index(path: Path) -> dict:
+    """Return the pages of an existing index keyed by docname."""
+    if not path.exists():
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            previous = json.load(f)
+        return {p["docname"]: p for p in previous.get("pages", []) if "docname" in p}
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable {path.name}: {e}")
+        return {}
+
 
 def build_json_index(app: Sphinx, exception):
     """Generate docs-index.json after build completes."""
@@ -25,6 +97,8 @@ def build_json_index(app: Sphinx, exception):
         return
 
     outdir = Path(app.outdir)
+    output_path = outdir / INDEX_FILENAME
+    previous_pages = load_previous_index(output_path)
 
     index = {
         "project": app.config.project,
@@ -33,15 +107,21 @@ def build_json_index(app: Sphinx, exception):
         "pages": []
     }
 
-    # Iterate through all documents
+    # Titles and toctree structure are already collected into the environment
+    # during the read phase (and merged across parallel workers), so there is
+    # no need to unpickle each doctree again here.
+    titles = app.env.titles
+    toctree_includes = getattr(app.env, 'toctree_includes', {})
+    page_metadata = getattr(app.env, 'json_index_pages', {})
+    changed = 0
+
     for docname in sorted(app.env.found_docs):
         try:
-            doc = app.env.get_doctree(docname)
-            title = ""
-            for node in doc.traverse():
-                if node.__class__.__name__ == 'title':
-                    title = node.astext()
-                    break
+            title_node = titles.get(docname)
+            title = title_node.astext() if title_node is not None else ""
+            if title == NO_TITLE:
+                # Sphinx's placeholder for pages without a section title
+                title = ""
 
             # Determine the HTML path based on builder type
             if app.builder.name == 'dirhtml':
@@ -56,25 +136,50 @@ def build_json_index(app: Sphinx, exception):
             }
 
             # Add toctree children if available
-            if hasattr(app.env, 'toctree_includes') and docname in app.env.toctree_includes:
-                page_info["children"] = app.env.toctree_includes[docname]
+            if docname in toctree_includes:
+                page_info["children"] = toctree_includes[docname]
+
+            metadata = page_metadata.get(docname, {})
+            content_hash = metadata.get("hash", "")
+            try:
+                size = (outdir / html_path).stat().st_size
+            except OSError:
+                size = 0
+
+            # Only used to report how many pages changed since the last build
+            if previous_pages.get(docname, {}).get("hash") != content_hash:
+                changed += 1
+
+            page_info["hash"] = content_hash
+            page_info["size"] = size
+            page_info["outline"] = metadata.get("outline", [])
 
             index["pages"].append(page_info)
         except Exception as e:
             logger.warning(f"Could not process {docname}: {e}")
 
     # Write JSON index
-    output_path = outdir / "docs-index.json"
     with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(index, f, indent=2, ensure_ascii=False)
+        if app.config.json_index_compact:
+            json.dump(index, f, separators=(',', ':'), ensure_ascii=False)
+        else:
+            json.dump(index, f, indent=2, ensure_ascii=False)
 
-    logger.info(f"Generated JSON index with {len(index['pages'])} pages at {output_path}")
+    logger.info(f"Generated JSON index with {len(index['pages'])} pages "
+                f"({changed} changed) at {output_path}")
 
 
 def setup(app: Sphinx):
+    # Write docs-index.json without whitespace
+    app.add_config_value('json_index_compact', False, 'html')
+
+    app.connect('doctree-read', collect_page_metadata)
+    app.connect('env-purge-doc', purge_page_metadata)
+    app.connect('env-merge-info', merge_page_metadata)
     app.connect('build-finished', build_json_index)
     return {
-        'version': '0.1',
+        'version': '0.3',
+        'env_version': 1,
         'parallel_read_safe': True,
         'parallel_write_safe': True,
     }
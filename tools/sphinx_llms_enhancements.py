@@ -8,6 +8,7 @@ This extension adds:
 """
 import re
 from pathlib import Path
+from typing import Dict, List
 from sphinx.application import Sphinx
 from sphinx.util import logging
 
@@ -47,6 +48,73 @@ DEFAULT_SECTION_MAPPINGS = {
 }
 
 
+def _is_anchored(pattern: str) -> bool:
+    """Return True if every match of ``pattern`` must start at position 0."""
+    # Conservative: a top-level alternation may hold unanchored branches
+    return pattern.startswith(('^', r'\A')) and '|' not in pattern
+
+
+class SectionClassifier:
+    """
+    Assign llms.txt page paths to sections.
+
+    All section patterns are compiled into a single regex with one alternative
+    per pattern, in priority order, so each path is classified with one match
+    call. The first section (in mapping order) with a pattern found anywhere in
+    the path wins, exactly as when trying each pattern with ``re.search``.
+    """
+
+    def __init__(self, section_mappings: Dict[str, List[str]], default: str = "Other"):
+        self.default = default
+        self.sections = list(section_mappings.keys())
+        self._group_sections = {}
+        self._combined = None
+        self._fallback = None
+        compiled = [(re.compile(pattern), section_name)
+                    for section_name, patterns in section_mappings.items()
+                    for pattern in patterns]
+
+        # Capturing groups would be renumbered inside the combined regex,
+        # changing what numbered backreferences refer to
+        if any(regex.groups for regex, _ in compiled):
+            self._fallback = compiled
+            return
+
+        alternatives = []
+        for regex, section_name in compiled:
+            group = f"_s{len(alternatives)}"
+            self._group_sections[group] = section_name
+            # Lookahead keeps re.search semantics while an empty group
+            # records which alternative matched; anchored patterns only
+            # need to be tried at the start of the path
+            prefix = "" if _is_anchored(regex.pattern) else "(?s:.*?)"
+            alternatives.append(f"(?={prefix}(?:{regex.pattern}))(?P<{group}>)")
+        try:
+            self._combined = re.compile("|".join(alternatives)) if alternatives else None
+        except re.error:
+            # Patterns that can't be combined (e.g. inline global flags) are
+            # matched one by one, still precompiled
+            self._group_sections = {}
+            self._fallback = compiled
+
+    def classify(self, path: str) -> str:
+        """Return the section name for a page path."""
+        if self._combined is not None:
+            match = self._combined.match(path)
+            if match:
+                return self._group_sections[match.lastgroup]
+        elif self._fallback is not None:
+            for pattern, section_name in self._fallback:
+                if pattern.search(path):
+                    return section_name
+        return self.default
+
+
+def compile_llms_sections(app: Sphinx, config) -> None:
+    """Compile the configured section mappings once per build."""
+    app.llms_section_classifier = SectionClassifier(config.llms_sections)
+
+
 def add_llms_script_tag(app: Sphinx, pagename: str, templatename: str,
                         context: dict, doctree) -> None:
     """Add <script type="text/llms.txt"> to HTML pages."""
@@ -107,49 +175,40 @@ def reorganize_llms_txt(app: Sphinx, exception) -> None:
         logger.warning("No pages found in llms.txt")
         return
 
-    # Get section mappings from config or use defaults
-    section_mappings = getattr(app.config, 'llms_sections', DEFAULT_SECTION_MAPPINGS)
+    classifier = getattr(app, 'llms_section_classifier', None)
+    if classifier is None:
+        classifier = SectionClassifier(getattr(app.config, 'llms_sections', DEFAULT_SECTION_MAPPINGS))
 
     # Categorize pages into sections
-    sections = {name: [] for name in section_mappings.keys()}
-    sections["Other"] = []  # Catch-all
-
-    for title, path, description in pages:
-        categorized = False
-        for section_name, patterns in section_mappings.items():
-            for pattern in patterns:
-                if re.search(pattern, path):
-                    sections[section_name].append((title, path, description))
-                    categorized = True
-                    break
-            if categorized:
-                break
-        if not categorized:
-            sections["Other"].append((title, path, description))
-
-    # Build new llms.txt with sections
-    new_content = header + "\n\n"
-
-    for section_name, section_pages in sections.items():
-        if not section_pages:
-            continue
-
-        new_content += f"## {section_name}\n\n"
-        for title, path, description in section_pages:
-            if description:
-                new_content += f"- [{title}]({path}): {description}\n"
-            else:
-                new_content += f"- [{title}]({path})\n"
-        new_content += "\n"
-
-    # Write reorganized llms.txt
-    llms_txt_path.write_text(new_content.strip() + "\n", encoding='utf-8')
+    sections = {name: [] for name in classifier.sections}
+    sections[classifier.default] = []  # Catch-all
+
+    for page in pages:
+        sections[classifier.classify(page[1])].append(page)
+
+    # Write reorganized llms.txt with sections
+    with open(llms_txt_path, 'w', encoding='utf-8') as f:
+        f.write(header)
+        f.write("\n")
+
+        for section_name, section_pages in sections.items():
+            if not section_pages:
+                continue
+
+            f.write(f"\n## {section_name}\n\n")
+            for title, path, description in section_pages:
+                if description:
+                    f.write(f"- [{title}]({path}): {description}\n")
+                else:
+                    f.write(f"- [{title}]({path})\n")
+
     logger.info(f"Reorganized llms.txt with {len(sections)} sections")
 
 
 def setup(app: Sphinx):
     # Config value for custom section mappings
     app.add_config_value('llms_sections', DEFAULT_SECTION_MAPPINGS, 'html')
+    app.connect('config-inited', compile_llms_sections)
 
     # Add script tag to each HTML page
     app.connect('html-page-context', add_llms_script_tag)
@@ -0,0 +1,139 @@
+"""
+Sphinx extension to precompress LLM-facing build artifacts.
+
+llms.txt, llms-full.txt, docs-index.json and the exported chunk shards are
+fetched in full by agents and by the chat backend. This extension writes
+``.gz`` (and ``.br`` when the optional ``brotli`` module is installed) variants
+next to them at the end of the build, so hosts and CDNs can serve them without
+compressing on the fly.
+
+A ``precompressed.json`` manifest records, for every artifact, a stable ETag
+derived from its content, its size and the paths and sizes of each encoding.
+Artifacts whose content hash is unchanged since the previous build are not
+recompressed.
+"""
+import gzip
+import hashlib
+import json
+from pathlib import Path
+from sphinx.application import Sphinx
+from sphinx.util import logging
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "precompressed.json"
+
+DEFAULT_PRECOMPRESS_FILES = [
+    "llms.txt",
+    "llms-full.txt",
+    "docs-index.json",
+    "chunks/*.jsonl",
+    "chunks/manifest.json",
+]
+
+
+def _compress_gzip(data: bytes) -> bytes:
+    # mtime=0 keeps the output byte-identical for identical input
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _compress_brotli(data: bytes) -> bytes:
+    return brotli.compress(data, quality=11)
+
+
+def _encoders() -> dict:
+    encoders = {"gzip": (".gz", _compress_gzip)}
+    if brotli is not None:
+        encoders["br"] = (".br", _compress_brotli)
+    return encoders
+
+
+def load_previous_manifest(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning(f"Ignoring unreadable {path.name}: {e}")
+        return {}
+
+
+def precompress_artifacts(app: Sphinx, exception) -> None:
+    """Write compressed variants and the manifest after build completes."""
+    if exception:
+        return
+
+    if app.builder.name not in ('html', 'dirhtml'):
+        return
+
+    outdir = Path(app.outdir)
+    manifest_path = outdir / MANIFEST_FILENAME
+    previous = load_previous_manifest(manifest_path)
+    encoders = _encoders()
+    if brotli is None:
+        logger.info("brotli not installed, writing gzip variants only")
+
+    paths = sorted({p for pattern in app.config.precompress_files for p in outdir.glob(pattern)})
+    files = {}
+    compressed = 0
+
+    for path in paths:
+        if not path.is_file():
+            continue
+        name = path.relative_to(outdir).as_posix()
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        etag = f'"{digest[:32]}"'
+
+        entry = {
+            "etag": etag,
+            "sha256": digest,
+            "size": len(data),
+            "encodings": {},
+        }
+
+        old_entry = previous.get(name, {})
+        for encoding, (suffix, compress) in encoders.items():
+            encoded_path = path.with_name(path.name + suffix)
+            old_encoding = old_entry.get("encodings", {}).get(encoding)
+            if (old_entry.get("sha256") == digest and old_encoding
+                    and encoded_path.exists()
+                    and encoded_path.stat().st_size == old_encoding["size"]):
+                entry["encodings"][encoding] = old_encoding
+                continue
+
+            encoded = compress(data)
+            encoded_path.write_bytes(encoded)
+            entry["encodings"][encoding] = {
+                "path": name + suffix,
+                "size": len(encoded),
+            }
+            compressed += 1
+
+        files[name] = entry
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({"files": files}, f, indent=2, ensure_ascii=False)
+
+    logger.info(f"Precompressed {len(files)} artifacts ({compressed} variants written) "
+                f"listed in {manifest_path}")
+
+
+def setup(app: Sphinx):
+    # Glob patterns, relative to the output directory, of files to precompress
+    app.add_config_value('precompress_files', DEFAULT_PRECOMPRESS_FILES, 'html')
+
+    # Run after the other build-finished steps have written their artifacts
+    app.connect('build-finished', precompress_artifacts, priority=950)
+
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }